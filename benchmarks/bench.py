@@ -0,0 +1,370 @@
+"""Benchmarks for blume hot paths.
+
+Runs offline, with the Agg backend, so no window appears.
+
+Usage::
+
+    python benchmarks/bench.py --output results.json
+
+    python benchmarks/bench.py --compare results.json
+
+    python benchmarks/bench.py -k table
+
+Results are written as JSON, with the git commit they were run
+against, so results from different commits can be compared with
+--compare.
+
+Benchmarks needing optional packages, such as healpy for
+PixelCounter, are skipped, with the reason recorded, when the package
+is missing.
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import datetime
+import platform
+import statistics
+import subprocess
+from pathlib import Path
+
+# benchmark the checkout this file is in
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """ Register a benchmark
+
+    The decorated function does any setup and returns a function to
+    time.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+# the roundabout queues belong to a loop, so stick with one
+LOOP = asyncio.new_event_loop()
+
+
+def arun(coro):
+    """ Turn a coroutine function into something that can be timed """
+    def timed():
+        return LOOP.run_until_complete(coro())
+
+    return timed
+
+
+def table_setup(rows, cols):
+
+    from blume.table import table
+
+    data = [[f'{row * col}' for col in range(cols)] for row in range(rows)]
+
+    def layout():
+        fig = plt.figure()
+        ax = fig.add_subplot()
+        table(ax, cellText=data, loc='center')
+        fig.canvas.draw()
+        plt.close(fig)
+
+    return layout
+
+
+@benchmark('table.table 5x5')
+def table_small():
+
+    return table_setup(5, 5)
+
+
+@benchmark('table.table 50x20')
+def table_large():
+
+    return table_setup(50, 20)
+
+
+@benchmark('TableCounts.update 100k')
+def tablecounts_update():
+
+    from blume.magic import TableCounts
+
+    counts = TableCounts(width=256, height=256)
+    xx = np.random.random(100000)
+    yy = np.random.random(100000)
+
+    def update():
+        counts.update(xx, yy)
+
+    return update
+
+
+@benchmark('TableCounts.show')
+def tablecounts_show():
+
+    from blume import magic
+
+    counts = magic.TableCounts(width=128, height=128)
+    counts.update(np.random.random(10000), np.random.random(10000))
+
+    async def show():
+        carpet = magic.Carpet()
+        carpet.sleep = 0
+        feeder = magic.spawn(magic.canine(carpet))
+        await counts.show()
+        feeder.cancel()
+        plt.close(carpet.image)
+
+    return arun(show)
+
+
+def spell_rows(nrows=2000):
+
+    return [dict(n=str(ix), x=f'{random.random():.4f}',
+                 date=f'2021-01-{1 + ix % 28:02d}', name=f'row{ix}')
+            for ix in range(nrows)]
+
+
+@benchmark('Spell.find_casts')
+def spell_find_casts():
+
+    from blume.magic import Spell
+
+    rows = spell_rows()
+
+    def find():
+        Spell().find_casts(rows)
+
+    return find
+
+
+@benchmark('Spell.cast_data 2000 rows')
+def spell_cast_data():
+
+    from blume.magic import Spell
+
+    rows = spell_rows()
+    spell = Spell()
+    spell.find_casts(rows)
+
+    def cast():
+        for row in spell.cast_data(rows):
+            pass
+
+    return cast
+
+
+@benchmark('Spell.stream 2000 rows')
+def spell_stream():
+
+    from blume.magic import Spell
+
+    rows = spell_rows()
+
+    def stream():
+        for row in Spell().stream(rows, cache=100):
+            pass
+
+    return stream
+
+
+@benchmark('RoundAbout put/get 10k')
+def roundabout_throughput():
+
+    from blume.magic import RoundAbout
+
+    tmra = RoundAbout()
+    count = 10000
+
+    async def throughput():
+
+        async def producer():
+            for ix in range(count):
+                await tmra.put(ix, 'bench')
+
+        task = asyncio.create_task(producer())
+        for ix in range(count):
+            await tmra.get('bench')
+        await task
+
+    return arun(throughput)
+
+
+@benchmark('Carpet.generate_mosaic 5x5')
+def carpet_mosaic():
+
+    from blume.magic import Carpet, Lifecycle
+
+    carpet = Carpet()
+    carpet.size = [5, 5]
+
+    def mosaic():
+        # drop the last mosaic, so each call starts from an empty carpet
+        for axe in carpet.axes:
+            carpet.image.delaxes(axe.delegate)
+        carpet.axes.clear()
+        carpet.lookup.clear()
+        carpet.lifecycle = Lifecycle()
+
+        carpet.generate_mosaic()
+
+    return mosaic
+
+
+@benchmark('Carpet.run')
+def carpet_run():
+
+    from blume.magic import Carpet, TheMagicRoundAbout
+
+    carpet = Carpet()
+    carpet.size = [3, 3]
+
+    async def run():
+        for ix in range(9):
+            await carpet.run()
+            TheMagicRoundAbout.get_nowait()
+
+    return arun(run)
+
+
+@benchmark('npmand 100k')
+def npmand():
+
+    from blume.mb import npmand
+
+    xx = np.linspace(-2, 1, 400)
+    yy = np.linspace(-1.5, 1.5, 250)
+    c = (xx[None, :] + 1j * yy[:, None]).flatten()
+
+    def mand():
+        for result in npmand(c, n=100):
+            pass
+
+    return mand
+
+
+@benchmark('PixelCounter.pix2image')
+def pix2image():
+
+    from blume.hp import PixelCounter
+
+    counter = PixelCounter(nside=64, xsize=500)
+    counter.pixels[:] = np.random.random(len(counter.pixels))
+
+    def image():
+        counter.pix2image()
+
+    return image
+
+
+@benchmark('import blume.farm')
+def import_farm():
+
+    code = ('import time; start = time.perf_counter(); import blume.farm; '
+            'print(time.perf_counter() - start)')
+    root = Path(__file__).absolute().parent.parent
+
+    def importer():
+        subprocess.run([sys.executable, '-c', code], cwd=root, check=True,
+                       capture_output=True)
+
+    return importer
+
+
+def time_it(func, repeat=5):
+    """ Time func, repeat times, after one warm up """
+    func()
+
+    times = []
+    for ix in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return dict(repeat=repeat,
+                min=min(times),
+                median=statistics.median(times),
+                mean=statistics.mean(times))
+
+
+def git_commit():
+
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        return None
+
+
+def run(names, repeat=5):
+
+    results = {}
+    for name in names:
+        try:
+            func = BENCHMARKS[name]()
+        except ImportError as e:
+            results[name] = dict(skipped=str(e))
+            print(f'{name:32} skipped: {e}')
+            continue
+
+        results[name] = time_it(func, repeat)
+        print(f'{name:32} {results[name]["median"] * 1000:10.3f} ms')
+
+    return dict(
+        commit=git_commit(),
+        when=datetime.datetime.now().isoformat(),
+        python=platform.python_version(),
+        matplotlib=matplotlib.__version__,
+        numpy=np.__version__,
+        results=results)
+
+
+def compare(old, new):
+    """ Print new median times as a ratio of old """
+    print()
+    print(f'compared with {old.get("commit")}')
+    for name, result in new['results'].items():
+        before = old['results'].get(name, {})
+        if 'median' in result and 'median' in before:
+            ratio = result['median'] / before['median']
+            print(f'{name:32} {ratio:8.2f}x')
+
+
+def main(args=None):
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--output', help='file to write results to')
+    parser.add_argument('-k', default='',
+                        help='only run benchmarks with this in their name')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--compare', help='earlier results to compare with')
+
+    args = parser.parse_args(args)
+
+    names = [name for name in BENCHMARKS if args.k in name]
+    results = run(names, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as old:
+            compare(json.load(old), results)
+
+
+if __name__ == '__main__':
+
+    main()
@@ -16,24 +16,47 @@ A list of headers, followed by a list of tuples.
 import csv
 from collections import Counter, defaultdict
 import argparse
+import itertools
+from concurrent import futures
 from pprint import pprint
 
 from blume import magic
+from blume.sketch import Profiler
 
 def data_to_rows(data):
-    """ Turn a list of strings into a list of dictionaries 
+    """ Turn strings into dictionaries 
+
+    data can be a list of strings, or an open file, or any other
+    iterable of lines: the first line has the keys.
     
     Spell/magic should do all of this stuff.
     """
+    lines = iter(data)
     
     # figure out what we have
-    for row in csv.reader(data):
+    for row in csv.reader(lines):
         keys = [x.strip() for x in row]
         break
 
-    for ix, row in enumerate(csv.DictReader(data[1:], keys)):
+    for ix, row in enumerate(csv.DictReader(lines, keys)):
         #print(ix, row)
         yield row
+
+
+def profile_file(path):
+    """ Profile the csv file at path """
+    with open(path) as infile:
+        return Profiler().update_rows(data_to_rows(infile))
+
+
+def profile_files(paths, workers=None):
+    """ Profile csv files, in parallel, merged into one Profiler """
+    profiler = Profiler()
+    with futures.ProcessPoolExecutor(workers) as pool:
+        for result in pool.map(profile_file, paths):
+            profiler.merge(result)
+
+    return profiler
     
 
 
@@ -68,27 +91,37 @@ class Cod(magic.Ball):
         self.keys = []
         self.index = None
         self.meta = {}
+        self.topn = 3
+
+        # rows kept for a closer look, the rest are just profiled
+        self.sample = 10
+        self.data = []
+        self.profiler = Profiler()
         
     def cast(self, data=None):
-
+        """ Profile data, a list of strings or an open csv file """
         data = data or []
-        
-        self.data = list(data_to_rows(data))
+
+        rows = data_to_rows(data)
+        self.data = list(itertools.islice(rows, self.sample))
+
+        self.profiler = Profiler()
+        self.profiler.update_rows(self.data)
+        self.profiler.update_rows(rows)
 
         if self.data:
             self.update_meta()
 
     def update_meta(self):
 
-        keys = self.data[0].keys()
-
         # simple counts of values can be informative
         counts = {}
-        for key in keys:
-            count = Counter([x[key] for x in self.data])
+        for key in self.profiler.keys():
+            profile = self.profiler[key]
+            count = Counter(dict(profile.most_common()))
             counts[key] = count
 
-            print(key, len(count))
+            print(key, profile.distinct.count())
             print(count.most_common(self.topn))
             print()
 
@@ -134,14 +167,24 @@ class Cod(magic.Ball):
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser()
-    parser.add_argument('infile')
+    parser.add_argument('infile', nargs='+')
     parser.add_argument('-topn', type=int, default=3)
+    parser.add_argument('--workers', type=int,
+                        help='processes to profile files with')
     args = parser.parse_args()
     
     spell = Cod()
     
     spell.update(args)
-    spell.cast(open(args.infile).readlines())
+    if len(args.infile) == 1:
+        with open(args.infile[0]) as infile:
+            spell.cast(infile)
+    else:
+        with open(args.infile[0]) as infile:
+            spell.data = list(itertools.islice(
+                data_to_rows(infile), spell.sample))
+        spell.profiler = profile_files(args.infile, args.workers)
+        spell.update_meta()
 
 
         
@@ -101,7 +101,7 @@ Your wish is my command!
             # Magic RoundAbout
             if len(key.strip()) == 1 and not self.console.buffer:
                 char = key.strip()
-                await self.put(char, char)
+                await self.put(magic.KeyPress(char), 'keys')
             else:
                 try:
                     result = self.console.push(key)
@@ -54,6 +54,14 @@ import random
 
 import math
 
+import time
+
+import itertools
+
+import asyncio
+
+from concurrent import futures
+
 import astropy.units as u
 import astropy.coordinates as coord
 
@@ -233,6 +241,9 @@ class Spiral(magic.Ball):
 
         self.details = True
 
+        # integrated curves, keyed on the parameters they depend on
+        self.cache = {}
+
 
     def rmin_check(self):
         """ The length of the roots of the spirals 
@@ -287,7 +298,7 @@ class Spiral(magic.Ball):
         K = self.K
         CC = self.CC
 
-        return (2 * A) - (2 * K * A * math.log(1 + K) / r) + CC / r
+        return (2 * A) - (2 * K * A * np.log(1 + K) / r) + CC / r
 
 
     def vinert(self, r, v):
@@ -322,7 +333,7 @@ class Spiral(magic.Ball):
         EE = self.EE
         K = self.K
         A = self.A
-        Log = math.log
+        Log = np.log
 
         # ok this deserves an explanation!
         energy = (-CC**2/(2*r**2) + (Mcent - 2*A*CC)/r -
@@ -338,23 +349,58 @@ class Spiral(magic.Ball):
         
         return energy
 
-    async def run(self):
+    def key(self):
+        """ Parameters that the integrated curves depend on
 
-        #xrdot, xvinert, xv, xtheta = cpr()
-        #await self.put(magic.fig2data(plt))
+        B only rotates the result, so it is not part of the key.
+        """
+        return (self.A, self.K, self.Mcent, self.Mball, self.Mdisc,
+                self.EE, self.CC, self.rmin, self.rmax)
+
+    def curves(self):
+        """ Return the model, evaluated over the range of radius
+
+        Results are cached by parameter values, so going back to
+        values seen before costs nothing.
+        """
+        key = self.key()
+        if key not in self.cache:
+            self.cache[key] = self.integrate()
 
-        # close previous plot if there is one
+        return self.cache[key]
 
+    def integrate(self):
+        """ Evaluate the model and integrate theta and t over radius
+
+        Parameters can also be column arrays, one row per
+        configuration, in which case everything comes back as 2D
+        arrays with a row per configuration.
+        """
         rr = np.arange(self.rmin, self.rmax, 10)
-        #vv = [self.v(r) for r in rr]
         vv = self.v(rr)
         ii = self.vinert(rr, vv)
         rdd = self.rdoubledot(rr, ii)
-        energy = np.array([self.energy(r) for r in rr])
-        #ii = [self.vinert(r, v) for (r, v) in zip(rr, vv)]
-        #rdd = [self.rdoubledot(r, v) for (r, v) in zip(rr, ii)]
+        energy = self.energy(rr)
         rdot = np.sqrt(2 * energy)
-        #print('spiral', len(rr), len(rdot))
+
+        thetadot = vv/rr;
+
+        dthetabydr = thetadot/rdot 
+        dtbydr = 1/rdot
+
+        NIntegrate = integrate.cumtrapz
+
+        thetaValues = NIntegrate(dthetabydr, rr, initial=0., axis=-1)
+        tvalues = NIntegrate(dtbydr, rr, initial=0., axis=-1)
+
+        return rr, vv, ii, rdd, rdot, thetaValues, tvalues
+
+    async def run(self):
+
+        #xrdot, xvinert, xv, xtheta = cpr()
+        #await self.put(magic.fig2data(plt))
+
+        rr, vv, ii, rdd, rdot, thetaValues, tvalues = self.curves()
 
         if self.details:
             ax = await self.get()
@@ -367,17 +413,6 @@ class Spiral(magic.Ball):
             ax.legend(loc=0)
             ax.show()
 
-        thetadot = vv/rr;
-
-        dthetabydr = thetadot/rdot 
-        dtbydr = 1/rdot
-
-        NIntegrate = integrate.cumtrapz
-
-        thetaValues = NIntegrate(dthetabydr, rr, initial=0.)
-        tvalues = NIntegrate(dtbydr, rr, initial=0.)
-
-
         B = self.B
         ax = await self.get()
         ax.projection('polar')
@@ -388,6 +423,154 @@ class Spiral(magic.Ball):
             
 
 
+def sweep_batch(configs, rmin=5000, rmax=50000):
+    """ Integrate a batch of Spiral configurations in one go
+
+    configs: list of dictionaries of Spiral parameters.
+
+    The parameters are stacked into column arrays so the whole batch
+    is a single set of 2D array operations and one cumtrapz per curve.
+
+    Parameters not in configs, K included, are left as Spiral has
+    them, so a configuration gives the same spiral as Spiral itself.
+
+    Returns a list of (config, theta, t) tuples and the seconds the
+    whole batch took.
+
+    Module level so it can be handed to a process pool.
+    """
+    start = time.perf_counter()
+
+    spiral = Spiral()
+    spiral.rmin = rmin
+    spiral.rmax = rmax
+    for name in configs[0]:
+        setattr(spiral, name, np.array([[cc[name]] for cc in configs]))
+
+    rr, vv, ii, rdd, rdot, theta, tt = spiral.integrate()
+
+    results = [(config, theta[ix], tt[ix])
+               for ix, config in enumerate(configs)]
+
+    return results, time.perf_counter() - start
+
+
+class Sweep(magic.Ball):
+    """ Sweep a grid of Spiral parameters
+
+    Each configuration in the grid is integrated in a process pool, in
+    batches, and the spirals are shown on the carpet as they arrive.
+
+    B only rotates a spiral, so it is not integrated over: each
+    integrated configuration is shown for every value of B.
+
+    Configurations already done are remembered, so changing the grid
+    only computes the new points.
+    """
+
+    def __init__(self, grid=None, batch=32, workers=None):
+
+        super().__init__()
+
+        spiral = Spiral()
+        grid = dict(grid or dict(
+            A=[spiral.A / 10, spiral.A, spiral.A * 10],
+            B=[spiral.B / 10, spiral.B, spiral.B * 10],
+            Mcent=[spiral.Mcent / 10, spiral.Mcent, spiral.Mcent * 10],
+            EE=[spiral.EE * 2, spiral.EE, spiral.EE / 2],
+            CC=[spiral.CC * 2, spiral.CC, spiral.CC / 2]))
+
+        # applied after integration
+        self.rotations = grid.pop('B', [spiral.B])
+        self.grid = grid
+
+        self.rmin = spiral.rmin
+        self.rmax = spiral.rmax
+
+        # configurations per process pool job
+        self.batch = batch
+        self.workers = workers
+
+        self.results = {}
+
+        # (configurations, seconds) for each batch
+        self.timings = []
+
+        self.add_filter('T', self.show_timings)
+
+    def configurations(self):
+        """ Every point in the grid, as a dictionary """
+        names = list(self.grid)
+        for values in itertools.product(*(self.grid[name] for name in names)):
+            yield dict(zip(names, values))
+
+    def batches(self):
+        """ Batches of configurations that are yet to be done """
+        batch = []
+        for config in self.configurations():
+            if tuple(config.items()) in self.results:
+                continue
+            batch.append(config)
+            if len(batch) == self.batch:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def run(self):
+
+        batches = list(self.batches())
+        if not batches:
+            return
+
+        # a pool just for this sweep, nothing left running after
+        pool = futures.ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            jobs = [asyncio.wrap_future(
+                        pool.submit(sweep_batch, batch, self.rmin, self.rmax))
+                    for batch in batches]
+
+            for job in asyncio.as_completed(jobs):
+                results, seconds = await job
+                self.timings.append((len(results), seconds))
+
+                for config, theta, tt in results:
+                    self.results[tuple(config.items())] = theta, tt
+                    for B in self.rotations:
+                        await self.show_spiral(dict(config, B=B), theta, tt)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def show_spiral(self, config, theta, tt):
+
+        rr = np.arange(self.rmin, self.rmax, 10)
+        values = theta - (config.get('B', 0.) * tt)
+
+        ax = await self.get()
+        ax.projection('polar')
+        ax.plot(values, rr)
+        ax.plot(values + math.pi, rr)
+        ax.set_title(' '.join(f'{key}={value:g}' for key, value in config.items()),
+                     fontsize='xx-small')
+        ax.axis('off')
+        ax.show()
+
+    async def show_timings(self):
+        """ Show time taken per batch of configurations """
+        msg = [['configurations', 'seconds', 'per configuration']]
+        for count, seconds in self.timings[-20:]:
+            msg.append([str(count), f'{seconds:.6f}',
+                        f'{seconds / count:.6f}'])
+
+        if self.timings:
+            count = sum(x[0] for x in self.timings)
+            seconds = sum(x[1] for x in self.timings)
+            msg.append([f'{count} in {len(self.timings)} batches',
+                        f'{seconds:.6f}', f'{seconds / count:.6f}'])
+
+        self.put_nowait(msg, 'help')
+
+
 def pick(x, v, vmin, vmax):
 
     n = len(v)
@@ -526,6 +709,10 @@ async def run(**args):
     spiral = Spiral()
     farm.add(spiral)
     farm.shep.path.append(spiral)
+
+    if args['sweep']:
+        farm.add(Sweep(batch=args['batch'], workers=args['workers']))
+
     await farm.start()
     print('about to run farm')
     await farm.run()
@@ -535,6 +722,12 @@ def main(args=None):
 
     parser = argparse.ArgumentParser()
     parser.add_argument('--galaxy', help="file of local galaxy data")
+    parser.add_argument('--sweep', action='store_true',
+                        help="sweep a grid of spiral parameters")
+    parser.add_argument('--batch', type=int, default=32,
+                        help="configurations per sweep job")
+    parser.add_argument('--workers', type=int,
+                        help="processes to use for the sweep")
 
     args = parser.parse_args(args)
 
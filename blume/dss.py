@@ -45,6 +45,9 @@ class Dss(magic.Ball):
         self.theta = 0.1
         self.phi = 5
         self.size = 50
+
+        # rows to calculate between updates of the image
+        self.tile = 128
         self.aaa = magic.modes
         
         self.alpha, self.beta, self.gamma, self.delta = [
@@ -77,9 +80,38 @@ class Dss(magic.Ball):
         a = alpha or self.alpha
         d = delta or self.delta
 
-        etb = sqrt((1+a)/(a+d)) + sqrt((1-d)/(a-d))
+        etb = math.sqrt((1+a)/(a+d)) + math.sqrt((1-d)/(a-d))
         
-        return log(etb)
+        return math.log(etb)
+
+    def blue_shift_times(self, alpha, delta):
+        """ Array version of blue_shift_time
+
+        alpha, delta: arrays, eg from np.meshgrid
+
+        Returns a masked array, with points where the time is not
+        defined masked out.
+        """
+        with np.errstate(all='ignore'):
+            etb = (np.sqrt((1+alpha)/(alpha+delta)) +
+                   np.sqrt((1-delta)/(alpha-delta)))
+
+            return np.ma.masked_invalid(np.log(etb))
+
+    def grid(self, size=None, epsilon=1e-3):
+        """ The alpha, delta grid for an image of size x size """
+        size = size or self.size
+
+        steps = np.arange(1, size+1) / (size+1)
+
+        alpha, delta = np.meshgrid(
+            np.cosh(self.phi * steps), np.cos(math.pi * steps))
+
+        # zero means use epsilon
+        alpha[alpha == 0] = epsilon
+        delta[delta == 0] = epsilon
+
+        return alpha, delta
 
     def deSitter(self):
 
@@ -101,36 +133,31 @@ class Dss(magic.Ball):
     async def run(self):
 
         size = self.size
-        epsilon = 1e-3
+        alpha, delta = self.grid(size)
 
-        img = np.zeros((size, size))
+        img = np.ma.masked_all((size, size))
 
-        for row in range(1, size+1):
+        # fill the image a tile of rows at a time, showing progress
+        maps = None
+        for row in range(0, size, self.tile):
+            rows = slice(row, row + self.tile)
+            img[rows] = self.blue_shift_times(alpha[rows], delta[rows])
 
-            delta = math.cos(math.pi * row/(size+1))
-            for col in range(1, size+1):
-                alpha = math.cosh(self.phi * col/(size+1))
+            if maps is None:
+                ax = await self.get()
+                ax.hide_axes()
+        
+                maps = ax.imshow(img, cmap=magic.random_colour())
+                #ax.colorbar(maps)
 
-                try:
-                    img[row-1][col-1] = self.blue_shift_time(
-                        alpha or epsilon, delta or epsilon)
-                except:
-                    print_exc()
-                    print(alpha, delta)
-                    raise
- 
-            #print(img[row-1])
+                ax.show()
+            else:
+                maps.set_data(img)
+                maps.autoscale()
+                ax.carpet.draw()
 
             await magic.sleep(0)
 
-        ax = await self.get()
-        ax.hide_axes()
-        
-        maps = ax.imshow(img, cmap=magic.random_colour())
-        #ax.colorbar(maps)
-
-        ax.show()
-
 
 def run():
 
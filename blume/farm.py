@@ -57,23 +57,18 @@ import datetime
 import asyncio
 curio = asyncio
 
-import numpy as np
-
-from PIL import Image
-
-import matplotlib
-
-from matplotlib import figure, rc
-
-from matplotlib import pyplot as plt
-
 from blume import magic, console
+from .lazy import Lazy
 from .magic import Ball, RoundAbout, Shepherd, Carpet, spawn
 
 from .mclock2 import GuidoClock
 from .rcparms import Params
 from .console import Console
 
+np = Lazy('numpy')
+
+figure = Lazy('matplotlib.figure')
+
 
 class Farm(Ball):
     """ A farm, for now.. 
@@ -102,6 +97,9 @@ class Farm(Ball):
         self.hub = hub
         self.shep = Shepherd()
 
+        # balls running in worker processes, see add
+        self.remotes = []
+
         # register quit event with shepherd
         self.shep.add_filter('q', self.quit)
         print('OK to here2')
@@ -164,10 +162,21 @@ class Farm(Ball):
         for edge in hub.edges:
             print(edge, hub.edges[edge])
 
-    def add(self, item):
+    def add(self, item, process=False, inputs=(), outputs=()):
+        """ Add item to the farm
+
+        process: run item in a worker process, see blume.remote.
+
+        inputs, outputs: channels to bridge to and from the worker.
+        """
+        if process:
+            from .remote import Remote
+            item = Remote(item, inputs=inputs, outputs=outputs)
+            self.remotes.append(item)
 
         #self.add_edge(item, self.carpet)
         self.add_edge(self.carpet, item)
+        return item
 
     async def start(self):
         """ Traverse the graph do some plumbing? 
@@ -214,6 +223,10 @@ class Farm(Ball):
 
         await self.shep.quit()
 
+        # stop the worker processes, freeing their shared memory
+        for remote in self.remotes:
+            await remote.quit()
+
         self.superdog.cancel()
 
 
@@ -0,0 +1,40 @@
+"""
+Modules, imported when first needed.
+
+matplotlib, pyplot, numpy and PIL take a good part of a second to
+import.  Code that only wants a RoundAbout or a Spell should not have
+to wait for them.
+
+So instead of::
+
+    from matplotlib import pyplot as plt
+
+modules here do::
+
+    plt = Lazy('matplotlib.pyplot')
+
+and the real import happens the first time something asks for
+`plt.figure`, or any other attribute.
+"""
+import importlib
+
+
+class Lazy:
+    """ Stand in for a module, imported on first attribute access """
+
+    def __init__(self, name):
+
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+
+        state = 'loaded' if self._module else 'not loaded'
+        return f'<Lazy {self._name}, {state}>'
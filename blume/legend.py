@@ -80,13 +80,18 @@ axes.
 
 """
 import traceback
+from itertools import zip_longest
+
+import kiwisolver as kiwi
+
 from matplotlib import offsetbox, pyplot, artist, transforms, figure
+from matplotlib import font_manager, rcParams, cbook, mathtext
 from matplotlib import _layoutgrid as layoutgrid
 
 from matplotlib.offsetbox import TextArea, HPacker, VPacker, DrawingArea
 #offsetbox.DEBUG = True
 
-from blume import magic
+from blume import magic, taybell
 from blume.table import Cell
 
 class LegendArray(magic.Ball):
@@ -114,17 +119,221 @@ class LegendArray(magic.Ball):
 class Cell(offsetbox.OffsetBox):
     pass
 
+class GridLayout:
+    """ Row heights and column widths for a grid of text
+
+    Everything is solved in units of the fontsize, ems, so the
+    solution holds at any fontsize: scaling the grid is just a
+    multiply.
+
+    Text is measured once, with `taybell.metrics`, and the sizes
+    solved as constraints: each column at least as wide as its widest
+    text, each row as tall as its tallest, all equal for the 'equal'
+    mode, and otherwise as small as possible.
+
+    The solution is kept until the text, or the font, changes.
+
+    mode: 'equal' for equal rows and columns, anything else packs
+    them as tight as the text allows.
+
+    align: where text goes in its cell, left, right or center and top,
+    bottom or center.
+
+    sep: space between columns, in ems.
+    """
+    # size to measure text at, widths are divided by this to get ems
+    REFERENCE = 100
+
+    # baselines are this many ascents apart, as for matplotlib text
+    LINESPACING = 1.2
+
+    def __init__(self, data, mode='equal', align='baseline', sep=0.5):
+
+        self.data = [[str(item) for item in row] for row in data]
+        self.mode = mode
+        self.align = align
+        self.sep = sep
+
+        # bumped whenever the text changes
+        self.version = 0
+        self.key = None
+        self.solution = None
+
+    def set_text(self, row, col, text):
+
+        self.data[row][col] = str(text)
+        self.version += 1
+
+    def solve(self, path):
+        """ Solve the layout for the font at path, or reuse the last one
+
+        Returns width and height in ems and a list of (line, x, y)
+        with the position of each line's baseline, in ems from the
+        bottom left of the grid.
+        """
+        key = (self.version, path, self.mode, self.align, self.sep)
+        if key != self.key:
+            self.solution = self.layout(path)
+            self.key = key
+
+        return self.solution
+
+    def layout(self, path):
+
+        metrics = taybell.metrics(path, self.REFERENCE)
+        font = font_manager.get_font(path)
+        ascent = font.ascender / font.units_per_EM
+        descent = -font.descender / font.units_per_EM
+        step = self.LINESPACING * ascent
+
+        nrows = len(self.data)
+        ncols = max((len(row) for row in self.data), default=0)
+
+        widths = [kiwi.Variable(f'width{col}') for col in range(ncols)]
+        heights = [kiwi.Variable(f'height{row}') for row in range(nrows)]
+
+        solver = kiwi.Solver()
+        for var in widths + heights:
+            solver.addConstraint((var == 0) | 'weak')
+
+        cells = {}
+        for row, items in enumerate(self.data):
+            for col, text in enumerate(items):
+                lines = text.split('\n')
+                sizes = [self.measure(line, path, metrics) / self.REFERENCE
+                         for line in lines]
+                height = ascent + descent + (len(lines) - 1) * step
+                cells[row, col] = lines, sizes
+
+                solver.addConstraint(widths[col] >= max(sizes))
+                solver.addConstraint(heights[row] >= height)
+
+        if self.mode == 'equal':
+            for var in widths[1:]:
+                solver.addConstraint(var == widths[0])
+            for var in heights[1:]:
+                solver.addConstraint(var == heights[0])
+
+        solver.updateVariables()
+        widths = [var.value() + self.sep for var in widths]
+        heights = [var.value() for var in heights]
+
+        width = sum(widths)
+        height = sum(heights)
+
+        runs = []
+        top = height
+        for row, rowheight in enumerate(heights):
+            left = self.sep / 2
+            for col, colwidth in enumerate(widths):
+                if (row, col) in cells:
+                    lines, sizes = cells[row, col]
+                    runs += self.place(
+                        lines, sizes, left, top, colwidth - self.sep,
+                        rowheight, ascent, descent, step)
+                left += colwidth
+            top -= rowheight
+
+        return width, height, runs
+
+    def measure(self, line, path, metrics):
+        """ Width of line in points at the REFERENCE size
+
+        Lines with mathtext are measured as mathtext, as that is how
+        GridBox draws them.
+        """
+        if not cbook.is_math_text(line):
+            return metrics.width(line)
+
+        prop = font_manager.FontProperties(fname=path, size=self.REFERENCE)
+        return mathtext.MathTextParser('path').parse(line, 72, prop).width
+
+    def place(self, lines, sizes, left, top, width, height,
+              ascent, descent, step):
+        """ Baselines for the lines of one cell """
+        textheight = ascent + descent + (len(lines) - 1) * step
+        if self.align == 'bottom':
+            top -= height - textheight
+        elif self.align == 'center':
+            top -= (height - textheight) / 2
+
+        runs = []
+        baseline = top - ascent
+        for line, size in zip(lines, sizes):
+            x = left
+            if self.align == 'right':
+                x += width - size
+            elif self.align == 'center':
+                x += (width - size) / 2
+
+            runs.append((line, x, baseline))
+            baseline -= step
+
+        return runs
+
+
+class GridBox(offsetbox.OffsetBox):
+    """ Draws a GridLayout
+
+    Text is drawn straight to the renderer at the solved positions,
+    nothing is measured at draw time.
+    """
+    def __init__(self, layout, prop=None, color=None):
+
+        super().__init__()
+        self.layout = layout
+        self.prop = prop or font_manager.FontProperties()
+        self.color = color or rcParams['text.color']
+
+    def solve(self):
+
+        return self.layout.solve(font_manager.findfont(self.prop))
+
+    def get_bbox(self, renderer):
+
+        width, height, runs = self.solve()
+        fontsize = renderer.points_to_pixels(self.prop.get_size_in_points())
+
+        return transforms.Bbox.from_bounds(
+            0, 0, width * fontsize, height * fontsize)
+
+    def draw(self, renderer):
+
+        width, height, runs = self.solve()
+        fontsize = renderer.points_to_pixels(self.prop.get_size_in_points())
+        ox, oy = self._offset
+        canvash = renderer.get_canvas_width_height()[1]
+
+        gc = renderer.new_gc()
+        gc.set_foreground(self.color)
+        gc.set_alpha(self.get_alpha())
+
+        for line, x, y in runs:
+            y = oy + y * fontsize
+            if renderer.flipy():
+                y = canvash - y
+            renderer.draw_text(
+                gc, ox + x * fontsize, y, line, self.prop, 0,
+                ismath=cbook.is_math_text(line))
+
+        gc.restore()
+        self.stale = False
+
+
 class Grid(offsetbox.AnchoredOffsetbox):
     """ A grid of cells.
 
-    What I really need here is just create a grid of
-    nested [HV]Packers.
+    This used to be nested [HV]Packers of TextAreas, which measure
+    every bit of text on every draw.
 
-    But you cannot create the Packers until you have it's children.
+    Now a GridLayout solves the row heights and column widths once, in
+    units of the fontsize.  The solution is reused until the text
+    changes, so drawing, or working out the extent, is just arithmetic.
 
-    The way forward is less clear.
+    inner and outer are no longer used: transpose swaps rows and
+    columns.
 
-    For now, just create something, so we can explore the mode
+    mode: 'equal' makes all rows and all columns the same size.
     """
     def __init__(self,
                  data,
@@ -135,53 +344,35 @@ class Grid(offsetbox.AnchoredOffsetbox):
                  transpose=False,
                  bbox=None,
                  loc=None,
-                 prop=None):
+                 prop=None,
+                 sep=0.5):
 
-        if inner is None: inner = HPacker
-        if outer is None: outer = VPacker
         if transpose:
-            inner, outer = outer, inner
+            data = list(zip_longest(*data, fillvalue=''))
 
         align = align or 'baseline'
         mode = mode or 'equal'
         loc = loc or 1
-        hboxes = []
 
-        textprops = None
-        if prop:
-            textprops = prop.copy()
-            
-        for row in data:
-            #textprops = dict(horizontalalignment='right')
-            #textprops = {}
-            children = [TextArea(item, textprops=textprops) for item in row]
-            
-            hboxes.append(inner(pad=0, sep=0, mode=mode, align=align,
-                                children=children))
-
-        vbox = outer(pad=0, sep=0, align=align, mode=mode,
-                     children=hboxes)
+        self.box = GridBox(GridLayout(data, mode, align, sep))
+
         super().__init__(loc=loc,
                          #bbox_to_anchor=(0, 0, 1, 1),
-                         child=vbox,
+                         child=self.box,
                          prop=prop)
 
-    def scale(self, factor):
+        # share the fontsize, so scale can change it in one place
+        self.box.prop = self.prop
 
-        for child in self._children:
-            for gchild in child._children:
-                t = gchild._text
-                t.set_size(t.get_size() * factor)
-                
+    def set_text(self, row, col, text):
 
-    def get_window_extent(self, renderer):
-        """Return the bounding box of the table in window coords."""
+        self.box.layout.set_text(row, col, text)
+        self.stale = True
 
-        boxes = []
-        for child in self.get_children():
-            boxes += [x.get_window_extent(renderer) for x in child.get_children()]
-        
-        return transforms.Bbox.union(boxes)
+    def scale(self, factor):
+
+        self.prop.set_size(self.prop.get_size_in_points() * factor)
+        self.stale = True
 
     def xdraw(self, renderer):
 
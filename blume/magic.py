@@ -104,16 +104,20 @@ import argparse
 
 import operator
 
-from traceback import print_exc
+from traceback import print_exc, print_exception
 
 import inspect
 
-import dateutil
-
 import functools
 
 import time
 
+import json
+
+import os
+
+import contextlib
+
 #import curio
 import asyncio
 curio = asyncio
@@ -123,25 +127,361 @@ run = curio.run
 
 spawn = curio.create_task
 
-import numpy as np
+# the heavy stuff is imported when first used, see lazy.py
+from .lazy import Lazy
 
-from PIL import Image
+np = Lazy('numpy')
 
-import matplotlib
+Image = Lazy('PIL.Image')
 
-from matplotlib.transforms import Bbox
+matplotlib = Lazy('matplotlib')
 
-from matplotlib import figure, artist, patches, colors, rc
+transforms = Lazy('matplotlib.transforms')
 
-from matplotlib import pyplot as plt
+patches = Lazy('matplotlib.patches')
+
+plt = Lazy('matplotlib.pyplot')
 
 from .modnar import random_colour, random_queue
 
-from . import table
+table = Lazy(__package__ + '.table')
 
 Parser = argparse.ArgumentParser
 
 
+class KeyPress:
+    """ A key and the time it arrived """
+
+    def __init__(self, key, stamp=None):
+
+        self.key = key
+        self.stamp = stamp or time.perf_counter()
+
+    def __repr__(self):
+
+        return f'KeyPress({self.key!r})'
+
+
+class Latency:
+    """ How long keys take, from arriving to being seen on screen
+
+    For each key and handler, keeps recent samples of:
+
+        queue: time in the queue, before the dispatcher picks it up.
+
+        handle: time for the handler to finish, including awaiting
+                it if it is a coroutine.
+
+        draw: time from the handler finishing to the next draw of the
+              carpet.  None if there is no draw within timeout seconds.
+
+    Handy for finding the handlers that make things feel sluggish.
+    """
+
+    def __init__(self, maxlen=200, timeout=1.0):
+
+        self.samples = defaultdict(lambda: deque(maxlen=maxlen))
+        self.timeout = timeout
+
+        # handled, waiting for a draw
+        self.pending = []
+
+    def handled(self, key, handler, stamp, start, end=None):
+        """ Record a key whose handler has finished """
+        end = end or time.perf_counter()
+        self.pending.append((key, handler, start - stamp, end - start, end))
+
+    def drawn(self, when=None):
+        """ Called when the carpet has drawn, completes pending samples """
+        when = when or time.perf_counter()
+        for key, handler, wait, took, end in self.pending:
+            draw = when - end
+            if draw > self.timeout:
+                draw = None
+            self.samples[(key, handler)].append((wait, took, draw))
+
+        self.pending.clear()
+
+    def stats(self):
+        """ Summary statistics, one dictionary per key and handler
+
+        Times are in seconds.
+        """
+        rows = []
+        for (key, handler), samples in sorted(self.samples.items()):
+            row = dict(key=key, handler=handler, count=len(samples))
+            for ix, name in enumerate(('queue', 'handle', 'draw')):
+                values = [x[ix] for x in samples if x[ix] is not None]
+                if values:
+                    row[name] = np.median(values)
+                    row[name + '_p90'] = np.percentile(values, 90)
+                    row[name + '_max'] = max(values)
+            rows.append(row)
+
+        return rows
+
+    def table(self):
+        """ stats, as a list of lists of strings, in milliseconds """
+        msg = [['key', 'handler', 'n', 'queue p50/p90', 'handle p50/p90',
+                'draw p50/p90']]
+
+        def ms(row, name):
+            if name not in row:
+                return '-'
+            return f'{row[name] * 1000:.1f}/{row[name + "_p90"] * 1000:.1f}'
+
+        for row in self.stats():
+            msg.append([row['key'], row['handler'], str(row['count']),
+                        ms(row, 'queue'), ms(row, 'handle'), ms(row, 'draw')])
+
+        return msg
+
+
+class Tracer:
+    """ Record a timeline of what the event loop is doing
+
+    Spans for runs of balls and tasks, relay and key callbacks and
+    waits on the roundabout queues, written out as Chrome trace event
+    JSON.  Load the file into https://ui.perfetto.dev or
+    chrome://tracing to see how the loop is shared out.
+
+    Each asyncio task gets its own track.
+
+    Off until started, and then only for as many seconds as asked.
+    """
+
+    def __init__(self):
+
+        self.active = False
+        self.events = []
+        self.tracks = {}
+        self.until = None
+        self.filename = None
+
+    def start(self, seconds=10, filename=None):
+        """ Trace for seconds, then save to filename """
+        self.events = []
+        self.tracks = {}
+        self.until = time.perf_counter() + seconds
+        self.filename = filename or f'blume-trace-{datetime.datetime.now():%Y%m%d-%H%M%S}.json'
+        self.active = True
+        print(f'tracing for {seconds} seconds')
+
+    def stop(self):
+        """ Stop tracing and save what there is """
+        if not self.active:
+            return
+        self.active = False
+        self.save(self.filename)
+
+    def track(self):
+        """ Number of the track for the current task """
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+
+        key = id(task)
+        if key not in self.tracks:
+            self.tracks[key] = len(self.tracks) + 1
+            name = task.get_name() if task else 'main'
+            if task:
+                name = f'{name} {task.get_coro().__qualname__}'
+            self.events.append(dict(
+                ph='M', name='thread_name', pid=os.getpid(),
+                tid=self.tracks[key], args=dict(name=name)))
+
+        return self.tracks[key]
+
+    def complete(self, name, cat, start, end=None, **args):
+        """ Add a span, start and end are time.perf_counter() values """
+        if not self.active:
+            return
+
+        end = end or time.perf_counter()
+        self.events.append(dict(
+            ph='X', name=name, cat=cat,
+            ts=start * 1e6, dur=(end - start) * 1e6,
+            pid=os.getpid(), tid=self.track(), args=args))
+
+        if end > self.until:
+            self.stop()
+
+    @contextlib.contextmanager
+    def span(self, name, cat='run', **args):
+        """ Context manager, records a span for its body """
+        if not self.active:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, cat, start, **args)
+
+    def save(self, filename):
+        """ Write Chrome trace event JSON """
+        with open(filename, 'w') as output:
+            json.dump(dict(traceEvents=self.events,
+                           displayTimeUnit='ms'), output)
+        print(f'saved {len(self.events)} trace events to {filename}')
+
+
+def artist_bytes(artist):
+    """ Rough size in bytes of the data an artist is holding on to
+
+    Counts the arrays behind images, collections, lines and patches,
+    plus a fixed overhead for the artist itself.
+    """
+    nbytes = Accountant.overhead
+
+    if hasattr(artist, 'get_paths'):
+        # collections
+        nbytes += sum(path.vertices.nbytes for path in artist.get_paths())
+        nbytes += np.asarray(artist.get_offsets()).nbytes
+        nbytes += np.asarray(artist.get_facecolor()).nbytes
+    elif hasattr(artist, 'get_xydata'):
+        # lines
+        nbytes += np.asarray(artist.get_xydata()).nbytes
+    elif hasattr(artist, 'get_path'):
+        # patches
+        nbytes += artist.get_path().vertices.nbytes
+
+    if hasattr(artist, 'get_array'):
+        # images and collections with a colour array
+        data = artist.get_array()
+        if data is not None:
+            nbytes += np.ma.getdata(data).nbytes
+            if np.ma.is_masked(data):
+                nbytes += np.ma.getmaskarray(data).nbytes
+
+    return nbytes
+
+
+def artists(artist):
+    """ artist and everything below it """
+    yield artist
+    for child in artist.get_children():
+        yield from artists(child)
+
+
+class Accountant:
+    """ Keeps count of the artists on a carpet, and what they cost
+
+    A long running carpet collects things: background patches for axes
+    that are long gone, help tables that are hidden, axes kept around
+    in Carpet.meta.
+
+    A census counts artists and estimated bytes for the axes on the
+    carpet, grouped as background, foreground, showing and hidden, plus
+    detached axes that are no longer in the figure but still referenced.
+
+    Censuses are kept, to see how things grow over time.
+
+    budget: bytes allowed before hidden content is evicted, oldest first.
+
+    every: seconds between censuses.
+    """
+    # guess at what an artist costs, before any data
+    overhead = 1024
+
+    def __init__(self, budget=256 * 2**20, every=10, maxlen=360):
+
+        self.budget = budget
+        self.every = every
+        self.samples = deque(maxlen=maxlen)
+        self.evicted = Counter()
+        self.last = {}
+
+    def census(self, carpet):
+        """ Artists and bytes, by group """
+        counts = defaultdict(lambda: [0, 0])
+        showing = set(id(axe) for axe in carpet.showing.values())
+        in_figure = set(id(ax) for ax in carpet.image.axes)
+
+        def count(group, ax):
+            for artist in artists(ax):
+                counts[group][0] += 1
+                counts[group][1] += artist_bytes(artist)
+
+        for ax in carpet.image.axes:
+            if ax is carpet.background:
+                group = 'background'
+            elif ax is carpet.foreground:
+                group = 'foreground'
+            else:
+                axe = carpet.lookup.get(id(ax))
+                group = 'showing' if id(axe) in showing else 'hidden'
+            count(group, ax)
+
+        for axe in set(carpet.lookup.values()) | set(carpet.meta.values()):
+            if id(axe.delegate) not in in_figure:
+                count('detached', axe.delegate)
+
+        return dict(counts)
+
+    def sample(self, carpet):
+        """ Take a census and remember the totals """
+        self.last = self.census(carpet)
+        nartists = sum(x[0] for x in self.last.values())
+        nbytes = sum(x[1] for x in self.last.values())
+        self.samples.append((time.time(), nartists, nbytes))
+
+        return self.last
+
+    def growth(self):
+        """ Artists and bytes per hour, over the samples kept """
+        if len(self.samples) < 2:
+            return 0., 0.
+
+        (start, artists0, bytes0), (end, artists1, bytes1) = (
+            self.samples[0], self.samples[-1])
+
+        # too soon to tell
+        if end - start < 60:
+            return 0., 0.
+
+        hours = (end - start) / 3600
+
+        return (artists1 - artists0) / hours, (bytes1 - bytes0) / hours
+
+    def enforce(self, carpet):
+        """ Evict hidden content, oldest first, until within budget
+
+        Returns the number of things evicted.
+        """
+        if not self.samples:
+            return 0
+
+        total = self.samples[-1][2]
+        evicted = 0
+        for kind, nbytes, evict in carpet.evictable():
+            if total <= self.budget:
+                break
+            evict()
+            total -= nbytes
+            evicted += 1
+            self.evicted.update([kind])
+
+        return evicted
+
+    def table(self):
+        """ Latest census and growth, as a list of lists of strings """
+        msg = [['group', 'artists', 'MB']]
+        for group, (nartists, nbytes) in sorted(self.last.items()):
+            msg.append([group, str(nartists), f'{nbytes / 2**20:.2f}'])
+
+        artists_hour, bytes_hour = self.growth()
+        msg.append(['growth/hour', f'{artists_hour:.0f}',
+                    f'{bytes_hour / 2**20:.2f}'])
+        msg.append(['budget', '', f'{self.budget / 2**20:.0f}'])
+        for kind, count in self.evicted.items():
+            msg.append([f'evicted {kind}', str(count), ''])
+
+        return msg
+
+
 class RoundAbout:
     """ Pass self around.
     
@@ -161,12 +501,15 @@ class RoundAbout:
     # 
     queues = defaultdict(random_queue)
     counts = Counter()
+    latency = Latency()
+    tracer = Tracer()
     
     async def put(self, item, name=None):
 
         qq = self.queues[name]
         self.counts.update([f'put {name}'])
-        await qq.put(item)
+        with self.tracer.span(f'put {name}', 'queue'):
+            await qq.put(item)
 
     def put_nowait(self, item, name=None):
 
@@ -195,7 +538,8 @@ class RoundAbout:
         qq = self.queues[name]
         self.counts.update([f'get {name}'])
 
-        result = await qq.get()
+        with self.tracer.span(f'get {name}', 'queue'):
+            result = await qq.get()
 
         return result
 
@@ -509,7 +853,7 @@ class Axe:
         # restore hspace, wspace in subplotparms
         spp.hspace, spp.wspace = hspace, wspace
 
-        bbox = Bbox([[left, bottom], [right, top]])
+        bbox = transforms.Bbox([[left, bottom], [right, top]])
 
         return bbox
 
@@ -925,41 +1269,67 @@ class Spell:
     
     """
 
-    def __init__(self, cache=None):
+    def __init__(self, cache=1000):
         """  
         
         Older idea, updated::
 
         Cache size is how much rewind we get if a type changes
 
-        If None, everything gets cached.
+        If None, everything gets cached.  The default keeps memory
+        bounded however long the input.
 
         It would make sense to coordinate this with
         functools.lru_cache, now known as functools.cache (python 3.9).
         
         For small datasets this might be what you want.
 
+        Update: see stream, the cache is a buffer of rows waiting to
+        go out.  A type change recasts the rows still in the buffer.
         """
 
+        from dateutil import parser
+
         # casts by keyword
         self.casts = {}
-        self.date_parse = date_parse = dateutil.parser.parser().parse
+        self.date_parse = date_parse = parser.parser().parse
         self.upcast = {None: int, int: float, float: date_parse, date_parse: str}
         self.fill = {None: None, int: 0, float: 0.0, date_parse: None, str: ''}
 
         # how much data to look at to find casts
         self.sniff = 10
-        
+        self.cache = cache
+        self.datekey = None
+
+        # upcasts that came too late for rows already sent on
+        self.late = Counter()
         
     def spell(self, data):
         """ Apply casts to data
         
         Would like this to be dynamic, updating the casts as we go """
 
-        # short hand for:  for xx in self.cast_data(data); yield xx
-        yield from self.cast_data(data)
-        
+        # short hand for:  for xx in self.stream(data); yield xx
+        yield from self.stream(data)
         
+    def fit(self, cast, value):
+        """ Cast value, upcasting until something fits
+
+        Returns the cast that worked and the value.
+        """
+        if not value.strip():
+            return cast, self.fill.get(cast)
+
+        upcast = self.upcast
+        if cast is None:
+            cast = upcast[None]
+
+        while True:
+            try:
+                return cast, cast(value)
+            except (ValueError, TypeError, OverflowError):
+                cast = upcast[cast]
+
     def find_casts(self, data, sniff=10):
 
         sniff = sniff or self.sniff
@@ -968,16 +1338,11 @@ class Spell:
 
         casts = self.casts
         
-        upcast = self.upcast
-        
-        for row in data[-self.sniff:]:
+        for row in data[-sniff:]:
             for key in keys:
                 value = row[key].strip()
                 if value:
-                    try:
-                        casts.setdefault(key, int)(value)
-                    except:
-                        casts[key] = upcast[casts[key]]
+                    casts[key], _ = self.fit(casts.get(key), value)
                     
         # look for a (first) date key - probably should looke
         # for all dates, really we are looking for an index here
@@ -1013,12 +1378,87 @@ class Spell:
                 result[key] = cast(value)
             yield result
 
+    def stream(self, rows, cache=None):
+        """ Cast rows as they come, one pass, no sniffing first
+
+        Each value is cast with its column's current cast, upcasting
+        the column (int, float, date, str) when a value does not fit.
+
+        Rows wait in a buffer of up to cache rows before going out.
+        When a column is upcast, the rows still in the buffer are
+        recast, so everything in the buffer comes out the same type.
+
+        cache: rows to buffer, defaults to self.cache.  If None,
+        everything is buffered, so every row gets the final casts.
+
+        Rows that had already gone out when an upcast came along keep
+        their old type, self.late counts these upcasts by column.
+        """
+        cache = self.cache if cache is None else cache
+
+        casts = self.casts
+        buffer = deque()
+
+        # (row number, key) for each upcast, oldest first
+        changes = deque()
+        sent = 0
+        latest = -1
+
+        def emit():
+            nonlocal sent
+            number, raw, values = buffer.popleft()
+
+            # upcasts at or before this row do not affect it
+            while changes and changes[0][0] <= number:
+                changes.popleft()
+
+            for ix, key in list(changes):
+                # values that were not strings were passed through as is
+                if isinstance(raw.get(key), str):
+                    cast = casts[key]
+                    casts[key], values[key] = self.fit(cast, raw[key])
+                    if casts[key] is not cast:
+                        # everything seen so far was cast the old way
+                        changes.append((latest + 1, key))
+                        self.late.update([key])
+
+            sent += 1
+            return values
+
+        for number, row in enumerate(rows):
+            latest = number
+            values = {}
+            for key, value in row.items():
+                if not isinstance(value, str):
+                    values[key] = value
+                    continue
+
+                cast = casts.get(key)
+                newcast, values[key] = self.fit(cast, value)
+                if newcast is not cast and value.strip():
+                    casts[key] = newcast
+                    changes.append((number, key))
+                    if sent and cast is not None:
+                        self.late.update([key])
+                    if newcast is self.date_parse and self.datekey is None:
+                        self.datekey = key
+
+            buffer.append((number, row, values))
+
+            if cache is not None and len(buffer) > cache:
+                yield emit()
+
+        while buffer:
+            yield emit()
+
     def fields(self):
 
         return self.casts.keys()
 
 def find_date_key(record):
 
+    import dateutil.parser
+
     for key, value in record.items():
         try:
 
@@ -1097,6 +1537,11 @@ class Shepherd(Ball):
         self.relays = set()
         self.path = [self]
 
+        # key -> (sheep, callback), for the current path
+        self.bindings = {}
+        # (sheep, keys) for each sheep in the path the bindings are for
+        self.bound = []
+
         self.interaction = Interact(self.path[-1])
         self.road_runner = RoutineRunner(self.path[-1])
 
@@ -1111,6 +1556,7 @@ class Shepherd(Ball):
         self.add_filter('I', self.edit_current)
 
         self.add_filter('x', self.status)
+        self.add_filter('Y', self.toggle_trace)
 
         self.add_filter('i', self.interact)
         self.add_filter('j', self.routine_runner)
@@ -1199,17 +1645,102 @@ class Shepherd(Ball):
 
 
     def generate_key_relays(self, name='keys'):
+        """ Bring the key bindings up to date with the path
+
+        Only the part of the path that has changed since last time is
+        looked at, so moving along the path is cheap.
 
-        for rly in self.relays:
-            rly.cancel()
+        The current sheep is always re-bound, in case its filters
+        have changed.
+        """
+        bound = self.bound
+        common = 0
+        for (sheep, keys), current in zip(bound, self.path):
+            if sheep is not current:
+                break
+            common += 1
+        common = min(common, len(self.path) - 1)
+
+        while len(bound) > common:
+            self.unbind(*bound.pop(), name)
 
-        self.relays.clear()
-        for target, key, callback in self.generate_key_bindings():
-            listener = spawn(relay(key, callback))
-            self.relays.add(listener)
+        for sheep in self.path[common:]:
+            self.bind(sheep, name)
 
         self.put_nowait('gkr', 'oldgrey')
 
+    def bind(self, sheep, name='keys'):
+        """ Add sheep to the end of the bound path """
+        filters = sheep.filters[name]
+        for key, callback in filters.items():
+            self.bindings[key] = sheep, callback
+
+        self.bound.append((sheep, tuple(filters)))
+
+    def unbind(self, sheep, keys, name='keys'):
+        """ Undo bind for sheep, which has left the end of the path
+
+        Keys sheep had go back to whoever is next along the path.
+        """
+        for key in keys:
+            binding = self.bindings.get(key)
+            if binding is None or binding[0] is not sheep:
+                continue
+
+            del self.bindings[key]
+            for other, others in reversed(self.bound):
+                if key in others:
+                    self.bindings[key] = other, other.filters[name][key]
+                    break
+
+    async def dispatcher(self, channel='keys'):
+        """ Route key events to whatever the path has bound them to
+
+        One task reads all the keys, whether carpet events or key
+        strings.  Coroutines are spawned, so a slow callback does not
+        hold up the keys that follow.
+        """
+        while True:
+            msg = await self.get(channel)
+            key = getattr(msg, 'key', msg)
+
+            binding = self.bindings.get(key)
+            if binding is None:
+                continue
+
+            sheep, callback = binding
+            start = time.perf_counter()
+            stamp = getattr(msg, 'stamp', start)
+            try:
+                # partials and callable objects have no __name__
+                handler = (f'{sheep.__class__.__name__}.'
+                           f'{getattr(callback, "__name__", repr(callback))}')
+                result = callback()
+            except Exception:
+                print(f'{key} dispatch exception for {callback}')
+                print_exc()
+                continue
+
+            if inspect.iscoroutine(result):
+                task = spawn(result)
+                self.relays.add(task)
+                task.add_done_callback(functools.partial(
+                    self.relay_done, key=key, handler=handler,
+                    stamp=stamp, start=start))
+            else:
+                self.latency.handled(key, handler, stamp, start)
+                self.tracer.complete(handler, 'key', start, key=key)
+
+    def relay_done(self, task, key=None, handler=None, stamp=None, start=None):
+        """ Tidy up after a dispatched coroutine """
+        self.relays.discard(task)
+        self.latency.handled(key, handler, stamp, start)
+        self.tracer.complete(handler, 'key', start, key=key)
+
+        if not task.cancelled() and task.exception():
+            print('dispatch exception')
+            print_exception(task.exception())
+
     def generate_key_bindings(self, name='keys'):
 
         keys = set()
@@ -1226,6 +1757,13 @@ class Shepherd(Ball):
                 keys.add(key)
 
 
+    def toggle_trace(self, seconds=10):
+        """ Trace the event loop for a while, save Chrome trace JSON """
+        if self.tracer.active:
+            self.tracer.stop()
+        else:
+            self.tracer.start(seconds)
+
     async def show_help(self, name='keys'):
         """ Show what keys do what """
         print('HELP', self.path)
@@ -1260,6 +1798,13 @@ class Shepherd(Ball):
             msg = await self.get('help')
 
             try:
+                if is_big_table(msg):
+                    # only the rows in view get cells, page to see more
+                    tab = table.virtual_table(
+                        self.carpet.foreground, msg, bbox=(0,0,1,1))
+                    self.carpet.add_table(tab)
+                    continue
+
                 if not msg: msg = 'no message'
                 if isinstance(msg, str):
                     msg = [[msg]]
@@ -1304,6 +1849,10 @@ class Shepherd(Ball):
             else:
                 self.path.append(sheep)
 
+        # 'b' runs start again, one dispatcher is enough
+        dispatcher = self.running.get('dispatcher')
+        if dispatcher is None or dispatcher.done():
+            self.running['dispatcher'] = spawn(self.dispatcher())
         spawn(relay('gkr', self.generate_key_relays))
         spawn(relay('run', self.toggle_run, with_message=True))
 
@@ -1465,6 +2014,28 @@ def doc_firstline(value):
         return value.__name__
 
     
+def is_big_table(msg):
+    """ Is msg an astropy table, numpy array or dict of columns?
+
+    These can be any size, so get a table.VirtualTable.
+    """
+    if hasattr(msg, 'colnames'):
+        return True
+
+    if hasattr(msg, 'dtype'):
+        return getattr(msg, 'ndim', 0) in (1, 2)
+
+    if isinstance(msg, dict) and msg:
+        # columns: sequences, all the same length
+        lengths = set(
+            len(value) if hasattr(value, '__len__')
+            and not isinstance(value, str) else None
+            for value in msg.values())
+        return len(lengths) == 1 and None not in lengths
+
+    return False
+
+
 def get_widths(msg):
 
     # find max len of string for each column
@@ -1674,24 +2245,105 @@ def show():
 
         
 
+class Lifecycle:
+    """ Where each Axe is in its life
+
+    States:
+
+        waiting: made by generate_mosaic, not yet handed out.
+        handed: handed out, not yet shown.
+        shown: showing on the carpet.
+        hidden: was shown, now hidden.
+        retired: no longer in the figure, maybe kept in Carpet.meta.
+
+    There is a set of axes for each state, so finding all the axes in
+    a state does not mean looking at every axe.
+
+    Axes also have a count of references: one for each entry in the
+    carpet history and one for showing.  Handed out or hidden axes
+    with no references are loose, candidates for deletion.
+    """
+    states = ('waiting', 'handed', 'shown', 'hidden', 'retired')
+
+    def __init__(self):
+
+        self.state = {}
+        self.members = {state: {} for state in self.states}
+        self.refs = Counter()
+        self.loose = {}
+
+    def __getitem__(self, state):
+        """ The axes in state """
+        return self.members[state].values()
+
+    def __contains__(self, axe):
+
+        return id(axe) in self.state
+
+    def get(self, axe):
+
+        return self.state.get(id(axe))
+
+    def set(self, axe, state):
+        """ Move axe to state """
+        key = id(axe)
+        old = self.state.get(key)
+        if old is not None:
+            del self.members[old][key]
+
+        self.state[key] = state
+        self.members[state][key] = axe
+        self.check(axe)
+
+    def ref(self, axe):
+
+        self.refs[id(axe)] += 1
+        self.check(axe)
+
+    def unref(self, axe):
+
+        key = id(axe)
+        self.refs[key] -= 1
+        if self.refs[key] <= 0:
+            del self.refs[key]
+        self.check(axe)
+
+    def check(self, axe):
+        """ Keep track of whether axe is loose """
+        key = id(axe)
+        if (self.state.get(key) in ('handed', 'hidden')
+                and not self.refs[key]):
+            self.loose[key] = axe
+        else:
+            self.loose.pop(key, None)
+
+    def forget(self, axe):
+        """ Axe is gone for good """
+        key = id(axe)
+        state = self.state.pop(key, None)
+        if state is not None:
+            del self.members[state][key]
+        self.refs.pop(key, None)
+        self.loose.pop(key, None)
+
+    def counts(self):
+
+        return {state: len(members) for state, members in self.members.items()}
+
+
 class Carpet(Ball):
     """ Current status: history just added, wormholes opened.
 
-        FIXME: figure out lifecycle of an Axe
+        The lifecycle of each Axe is tracked by self.lifecycle, see
+        Lifecycle.
 
-        generate_mosaic creates and adds to self.axes
+        generate_mosaic creates and adds to self.axes, waiting.
 
-        Need to be able to know:
-             a. Axe has been handed out
-             b. Axe has been shown
-             c. Axe still in history
-             d. geometry -- so we can spot Axe replacing another in same spot.
-        
-        Cases:  
-            handed out, still in history == keep
-            handed out, not in history, 
+        run hands them out, show shows them and adds them to
+        self.history, and they are hidden when something else is
+        shown in the same place.
 
-        Deletion:
+        Deletion, by delete_old_axes, is for loose axes:
             a. not in history
             b. has been handed out
             c. not in current image:  ie self.showing
@@ -1702,6 +2354,16 @@ class Carpet(Ball):
 
         self.sleep = 0.01
 
+        # frame pacing: draw requests between frames become one draw
+        self.fps = 30
+        self.idle = 0.1
+        self.requests = 0
+        self.wake = asyncio.Event()
+        self.frames = deque(maxlen=100)
+
+        # what the carpet is holding on to
+        self.accountant = Accountant()
+
         # grid related
         self.size = [1, 1]  # wibni Interact operations worked sanely here
         self.simple = False
@@ -1711,6 +2373,7 @@ class Carpet(Ball):
         self.meta = {}
 
         self.history = deque(maxlen=random.randint(25, 50))
+        self.lifecycle = Lifecycle()
 
         self.axes = deque()
         self.lookup = dict()
@@ -1729,6 +2392,10 @@ class Carpet(Ball):
         # keyboard handling
         self.image.canvas.mpl_connect('key_press_event', self.keypress)
 
+        # key latency is measured up to the next draw
+        self.image.canvas.mpl_connect(
+            'draw_event', lambda event: self.latency.drawn())
+
         # let's see everything
         #self.log_events()
 
@@ -1748,6 +2415,13 @@ class Carpet(Ball):
         self.add_filter('>', self.raise_alpha)
         self.add_filter('t', self.toggle_table)
         self.add_filter('T', self.toggle_table_edges)
+        self.add_filter('L', self.show_latency)
+        self.add_filter('P', self.show_frames)
+        self.add_filter('R', self.show_resources)
+        self.add_filter('pagedown', self.page_down)
+        self.add_filter('pageup', self.page_up)
+        self.add_filter('home', self.page_home)
+        self.add_filter('end', self.page_end)
 
     def lower_alpha(self):
 
@@ -1775,6 +2449,31 @@ class Carpet(Ball):
         self.draw()
 
 
+    def show_latency(self):
+        """ Show how long keys take to handle and draw """
+        self.put_nowait(self.latency.table(), 'help')
+
+    def show_frames(self):
+        """ Show frame rate, draw times and draw requests per frame """
+        msg = [['frames', 'fps', 'draw p50/p90', 'requests/frame']]
+
+        if len(self.frames) > 1:
+            starts, draws, requests = zip(*self.frames)
+            fps = (len(starts) - 1) / ((starts[-1] - starts[0]) or 1)
+            draws = sorted(draws)
+            p50 = draws[len(draws) // 2] * 1000
+            p90 = draws[int(len(draws) * 0.9)] * 1000
+            msg.append([str(len(self.frames)), f'{fps:.1f}',
+                        f'{p50:.1f}/{p90:.1f}',
+                        f'{sum(requests) / len(requests):.1f}'])
+
+        self.put_nowait(msg, 'help')
+
+    def show_resources(self):
+        """ Show artists and memory held by the carpet """
+        self.accountant.sample(self)
+        self.put_nowait(self.accountant.table(), 'help')
+
     def log_events(self):
 
         events = [
@@ -1807,11 +2506,8 @@ class Carpet(Ball):
         """ Take keypress events put them out there """
 
         #print('mosaic carpet handling', event)
-        # use select here to get actual magic curio queue
-        # where put can magically be a coroutine or a function according
-        # to context.
-        qq = self.select(event.key)
-        qq.put_nowait(event)
+        # the shepherd's dispatcher routes it from here
+        self.put_nowait(KeyPress(event.key), 'keys')
 
     async def save(self):
         """ Save current image """
@@ -1842,24 +2538,94 @@ class Carpet(Ball):
         await self.rebuild()    
 
     async def rebuild(self):
-        self.hideall()
-        #self.generate_mosaic()
+        """ Re-grid the mosaic at the current size
+
+        Existing axes move to their place in the new grid, most
+        recently shown first, then any handed out, then any waiting.
+        New axes are only made for empty places, and only waiting axes
+        with no place left are deleted.  Axes that were showing but no
+        longer fit are hidden, they are still in the history.
+        """
+        rows, cols = self.size
+        grid = self.image.add_gridspec(rows, cols)
+        places = rows * cols
+
+        # most recently shown first, those gone from the history last
+        recency = {}
+        for ix, axe in enumerate(self.history):
+            recency.setdefault(id(axe), ix)
+        showing = sorted(
+            self.lifecycle['shown'],
+            key=lambda axe: recency.get(id(axe), len(recency)))
+
+        handed = list(self.lifecycle['handed'])
+        waiting = list(self.axes)
+
+        for key, axe in self.showing.items():
+            self.lifecycle.unref(axe)
+        self.showing.clear()
+        self.axes.clear()
+
+        for axe in showing[places:]:
+            axe.hide()
+
+        # keep the reading order of those that stay
+        def reading(axe):
+            spec = axe.get_subplotspec()
+            return spec.rowspan.start, spec.colspan.start
+
+        place = 0
+        for axe in sorted(showing[:places], key=reading):
+            axe.set_subplotspec(grid[place // cols, place % cols])
+            self.showing[self.get_axe_geometry(axe)] = axe
+            self.lifecycle.ref(axe)
+            place += 1
+
+            # move the background patch too
+            if hasattr(axe, 'img'):
+                bb = axe.get_full_bbox()
+                axe.img.set_bounds(*bb.p0, bb.width, bb.height)
+
+        # handed out axes get a place, shared if need be
+        for ix, axe in enumerate(handed):
+            spot = (place + ix) % places
+            axe.set_subplotspec(grid[spot // cols, spot % cols])
+        place += len(handed)
+
+        # waiting axes fill what is left, then make new ones
+        for spot in range(place, places):
+            cell = grid[spot // cols, spot % cols]
+            if waiting:
+                axe = waiting.pop(0)
+                axe.set_subplotspec(cell)
+            else:
+                ax = self.image.add_subplot(cell, visible=False)
+                ax.meta = dict(key=spot)
+                axe = Axe(ax, self)
+                self.lookup[id(ax)] = axe
+                self.lifecycle.set(axe, 'waiting')
+            self.axes.append(axe)
 
-        print('replay history', len(self.history))
+        # no room for these
+        for axe in waiting:
+            self.image.delaxes(axe.delegate)
+            self.delete_axe(axe)
 
-        await self.replay_history()
+        self.draw()
 
     def hideall(self):
 
         # hide everything currently being shown
         for key, ax in self.showing.items():
             ax.hide()
+            self.lifecycle.unref(ax)
             
         self.showing.clear()
 
         # drain any axes waiting in self.axes
         for ax in self.axes:
             ax.figure.delaxes(ax.delegate)
+            self.delete_axe(ax)
         self.axes.clear()
 
     async def history_back(self):
@@ -1882,11 +2648,13 @@ class Carpet(Ball):
         # we want to replace the current axes with the value we pop
         pos = await self.get()
         ax = self.history.popleft()
+        self.lifecycle.unref(ax)
         ax.position(pos)
         #ax.set_visible(True)
 
         if pos.delegate in self.image.axes:
             self.image.delaxes(pos.delegate)
+        self.delete_axe(pos)
         del pos
 
         ax.show()
@@ -1925,7 +2693,7 @@ class Carpet(Ball):
             for name in names:
                 self.expanded[name] = getattr(fig.subplotpars, name)
             
-            rc('image', aspect='auto')
+            matplotlib.rc('image', aspect='auto')
 
             fig.subplots_adjust(
                left=0, right=1,
@@ -1939,21 +2707,45 @@ class Carpet(Ball):
         self.draw()
         
     async def poll(self):
-        """ Gui Loop """
+        """ Gui Loop
 
-        # Experiment with sleep to keep gui responsive
-        # but not a cpu hog.
-        event = 0
+        Draws at most fps times a second, and only when something
+        asked for a draw.  However many draw requests come in during a
+        frame, there is just the one draw.
 
-        nap = 0.05
+        When nothing is being drawn, the gui is polled less and less
+        often, down to every idle seconds, so a quiet carpet is not a
+        cpu hog.  A draw request wakes it straight away.
+        """
         canvas = self.image.canvas
+        nap = 1 / self.fps
         while True:
-            #print('RUNNING EVENT LOOP')
-            
+            start = time.perf_counter()
+
             canvas.flush_events()
-            canvas.start_event_loop(self.sleep)
 
-            await sleep(self.sleep * 10)
+            if self.requests:
+                requests, self.requests = self.requests, 0
+                self.wake.clear()
+
+                with self.tracer.span('draw', 'carpet'):
+                    canvas.draw()
+                    canvas.flush_events()
+
+                took = time.perf_counter() - start
+                self.frames.append((start, took, requests))
+
+                # busy, so back to full speed, but leave time for others
+                nap = max(1 / self.fps - took, 0)
+                await sleep(nap)
+                nap = 1 / self.fps
+                continue
+
+            # nothing to draw, poll less often until woken
+            try:
+                await asyncio.wait_for(self.wake.wait(), nap)
+            except asyncio.TimeoutError:
+                nap = min(nap * 2, self.idle)
 
     async def start(self):
         
@@ -1963,7 +2755,7 @@ class Carpet(Ball):
         print("carpet starting tasks")
         poll_task = spawn(self.poll())
         print('POLL TASK SPAWNED')
-        self.tasks = [poll_task]
+        self.tasks = [poll_task, spawn(self.audit())]
         print("DONE STARTED carpet")
 
     def generate_mosaic(self):
@@ -1986,43 +2778,131 @@ class Carpet(Ball):
             axe = Axe(ax, self)
             self.axes.append(axe)
             self.lookup[id(ax)] = axe
+            self.lifecycle.set(axe, 'waiting')
 
     def delete_old_axes(self):
+        """ Delete loose axes: handed out, but not showing or in history """
+        for axe in list(self.lifecycle.loose.values()):
+            ax = axe.delegate
+            try:
+                ax.figure.delaxes(ax)
+            except KeyError:
+                # already gone from the figure
+                pass
 
-        naxes = len(self.image.axes)
+            meta_key = tuple(axe.meta.items())
+            if meta_key in self.meta:
+                self.delete_axe(self.meta[meta_key])
+            else:
+                axe.clear()
 
-        showing = self.showing.values()
+            #print(f'adding {meta_key} to carpet.meta {len(self.meta)}')
+            self.meta[meta_key] = axe
+            self.lifecycle.set(axe, 'retired')
 
-        for ax in self.image.axes:
-            if ax is self.background or ax is self.foreground:
-                continue
+    def delete_axe(self, axe):
+        
+        if hasattr(axe, 'img'):
+            axe.img.remove()
+            del axe.img
 
-            try:
-                axe = self.lookup[id(ax)]
-            except:
-                print(f'WHOA {id(ax)} {type(ax)} missing from lookup')
-                raise
+        self.lookup.pop(id(axe.delegate), None)
+        self.lifecycle.forget(axe)
 
-                
-            if (axe not in self.history and
-                axe not in showing):
-                ax.figure.delaxes(ax)
+    def remember(self, axe):
+        """ Add axe to the history """
+        if len(self.history) == self.history.maxlen:
+            # the oldest is about to drop off the end
+            self.lifecycle.unref(self.history[-1])
 
-                meta_key = tuple(axe.meta.items())
-                if meta_key in self.meta:
-                    self.delete_axe(self.meta[meta_key])
-                else:
-                    axe.clear()
+        self.history.appendleft(axe)
+        self.lifecycle.ref(axe)
 
-                #print(f'adding {meta_key} to carpet.meta {len(self.meta)}')
-                self.meta[meta_key] = axe
+    async def audit(self):
+        """ Count what the carpet holds, evict if over budget """
+        while True:
+            await sleep(self.accountant.every)
+
+            self.accountant.sample(self)
+            if self.accountant.enforce(self):
+                self.draw()
+
+    def evictable(self):
+        """ Hidden content that could go, oldest first
+
+        Yields (kind, bytes, evict) tuples, evict being a function to
+        call to get rid of it.
+        """
+        showing = set(id(axe) for axe in self.lifecycle['shown'])
+        keep = showing | set(self.lifecycle.refs)
+        in_figure = set(id(ax) for ax in self.image.axes)
+
+        def size(artist):
+            return sum(artist_bytes(x) for x in artists(artist))
+
+        # hidden help tables, the newest stays for toggle_table
+        for tab in list(self.tables)[:-1]:
+            if not tab.get_visible():
+                yield 'table', size(tab), functools.partial(
+                    self.evict_table, tab)
+
+        # background patches of axes no longer on the carpet
+        for axe in list(self.lookup.values()):
+            if (hasattr(axe, 'img') and id(axe) not in keep
+                    and id(axe.delegate) not in in_figure):
+                yield 'background', size(axe.img), functools.partial(
+                    self.evict_background, axe)
+
+        # axes remembered by meta
+        for key, axe in list(self.meta.items()):
+            if id(axe) not in keep and id(axe.delegate) not in in_figure:
+                yield 'meta', size(axe.delegate), functools.partial(
+                    self.evict_meta, key)
+
+        # hidden axes kept for history_back, oldest first, each axe
+        # once, placed by its most recent visit
+        recent = {}
+        for axe in self.history:
+            recent.setdefault(id(axe), axe)
+
+        for axe in reversed(list(recent.values())):
+            if id(axe) not in showing:
+                nbytes = size(axe.delegate)
+                if hasattr(axe, 'img'):
+                    nbytes += size(axe.img)
+                yield 'history', nbytes, functools.partial(
+                    self.evict_history, axe)
+
+    def evict_table(self, tab):
+
+        self.tables.remove(tab)
+        tab.remove()
+
+    def evict_background(self, axe):
 
-    def delete_axe(self, axe):
-        
         if hasattr(axe, 'img'):
             axe.img.remove()
+            del axe.img
+
+    def evict_history(self, axe):
+
+        while axe in self.history:
+            self.history.remove(axe)
+            self.lifecycle.unref(axe)
+
+        ax = axe.delegate
+        if ax in self.image.axes:
+            self.image.delaxes(ax)
+
+        self.delete_axe(axe)
+        ax.clear()
+
+    def evict_meta(self, key):
 
-        del self.lookup[id(axe.delegate)]
+        axe = self.meta.pop(key, None)
+        if axe is not None:
+            self.delete_axe(axe)
+            axe.delegate.clear()
 
         
         
@@ -2035,6 +2915,7 @@ class Carpet(Ball):
             self.generate_mosaic()
             
         axe = self.axes.popleft()
+        self.lifecycle.set(axe, 'handed')
         if self.simple:
             axe.simplify()
             axe.grid(True)
@@ -2054,22 +2935,31 @@ class Carpet(Ball):
             #print(f'Showing {id(tohide)} {tohide.get_visible()}')
             if tohide is not axe:
                 tohide.hide()
+                self.lifecycle.unref(tohide)
+                self.lifecycle.ref(axe)
+        else:
+            self.lifecycle.ref(axe)
 
-        self.history.appendleft(axe)
+        self.remember(axe)
         
         self.showing[gg] = axe
+        self.lifecycle.set(axe, 'shown')
 
         self.draw()
 
     def draw(self):
-        """ trigger a redraw """
-        self.image.canvas.draw_idle()
+        """ Ask for a redraw, at the next frame """
+        self.requests += 1
+        self.wake.set()
 
     def hide(self, axe):
 
         if axe.get_visible():
             axe.set_visible(False)
 
+        if self.lifecycle.get(axe) == 'shown':
+            self.lifecycle.set(axe, 'hidden')
+
     def add_table(self, table):
         """ Add a table to the carpet and show it """
 
@@ -2096,6 +2986,32 @@ class Carpet(Ball):
             
         self.draw()
 
+    def page_table(self, action):
+        """ Page the current table, if it is a VirtualTable """
+        if not self.tables:
+            return
+
+        tab = self.tables[-1]
+        if tab.get_visible() and hasattr(tab, action):
+            getattr(tab, action)()
+            self.draw()
+
+    def page_down(self):
+        """ Next page of the table """
+        self.page_table('page_down')
+
+    def page_up(self):
+        """ Previous page of the table """
+        self.page_table('page_up')
+
+    def page_home(self):
+        """ First page of the table """
+        self.page_table('home')
+
+    def page_end(self):
+        """ Last page of the table """
+        self.page_table('end')
+
     def toggle_table_edges(self):
 
         tab = self.tables[-1]
@@ -2141,6 +3057,9 @@ async def canine(ball):
     else:
         run = ball
 
+    name = f'{ball.__class__.__name__}.run'
+    tracer = TheMagicRoundAbout.tracer
+    
     sleepy = 0
     while True:
         if hasattr(ball, 'paused'):
@@ -2150,17 +3069,18 @@ async def canine(ball):
             
         if not paused:
             try:
-                # gymnastics to deal with callables coroutines
-                # or coroutinefunctions
-                if inspect.iscoroutine(run):
-                    result = run
-                else:
-                    result = run()
-
-                # now if it is a coroutine
-                if inspect.iscoroutine(result):
-                    #print(f'canine awaits result {runs} for {ball}')
-                    await result
+                with tracer.span(name, 'run', runs=runs):
+                    # gymnastics to deal with callables coroutines
+                    # or coroutinefunctions
+                    if inspect.iscoroutine(run):
+                        result = run
+                    else:
+                        result = run()
+
+                    # now if it is a coroutine
+                    if inspect.iscoroutine(result):
+                        #print(f'canine awaits result {runs} for {ball}')
+                        await result
             
                 runs += 1
 
@@ -2207,13 +3127,15 @@ class Task:
 
         args = self.args.copy()
         if self.plot:
-            ax = await magic.TheMagicRoundAbout.get()
+            ax = await TheMagicRoundAbout.get()
             args = [ax] + args
 
-        result = self.task(*args, **self.kwargs)
+        name = f'Task {getattr(self.task, "__name__", self.task)}'
+        with TheMagicRoundAbout.tracer.span(name, 'task'):
+            result = self.task(*args, **self.kwargs)
 
-        if inspect.iscoroutine(result):
-            result = await result
+            if inspect.iscoroutine(result):
+                result = await result
 
         self.result = result
 
@@ -2270,8 +3192,11 @@ def ellipsis(string, maxlen=200, keep=10):
 async def relay(channel, callback, with_message=False):
 
     import traceback
+    tracer = TheMagicRoundAbout.tracer
+    name = f'relay {channel} {getattr(callback, "__name__", callback)}'
     while True:
         msg = await TheMagicRoundAbout.get(channel)
+        start = time.perf_counter()
         try:
             if with_message:
                 result = callback(msg)
@@ -2289,6 +3214,8 @@ async def relay(channel, callback, with_message=False):
             except:
                 traceback.print_exc()
 
+        tracer.complete(name, 'relay', start)
+
 def runner(ball):
 
     TheMagicRoundAbout.put_nowait(ball, 'run')
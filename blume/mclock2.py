@@ -14,7 +14,11 @@ from datetime import timedelta, datetime
 import random
 import math
 import time
+
 from .magic import Ball, fig2data
+from .lazy import Lazy
+
+patches = Lazy('matplotlib.patches')
 
 MINUTES_TO_MIDNIGHT = -5.0
 
@@ -36,6 +40,15 @@ class GuidoClock(Ball):
         #self.tkcanvas.bind("<B1-Motion>", self.on_motion)
         #self.tkcanvas.bind("<ButtonRelease-1>", self.on_release)
 
+        # the axes we draw on and what is drawn there, we keep
+        # updating these until someone hides the axes.
+        self.ax = None
+        self.wedges = None
+        self.hands = None
+
+        # blit rather than ask the carpet to redraw, if the canvas can
+        self.blit = False
+
         self.timewarp = None
         self.add_filter('M', self.midnight)
         self.add_filter('o', self.random_hour)
@@ -134,12 +147,32 @@ class GuidoClock(Ball):
 
     async def run(self):
 
-        self.ax = await self.get()
-
-        #print('GUIDOCLOCK run')
-        self.redraw()
-        self.ax.show()
+        if self.ax is None or not self.ax.get_visible():
+            # need a new axes, draw everything from scratch
+            self.ax = await self.get()
+            self.wedges = self.hands = None
 
+            #print('GUIDOCLOCK run')
+            self.redraw()
+            self.ax.show()
+        else:
+            self.redraw()
+            self.update()
+
+    def update(self):
+        """ Get the latest drawing onto the screen """
+        ax = self.ax
+        canvas = ax.figure.canvas
+
+        if self.blit and canvas.supports_blit:
+            for artist in self.wedges:
+                ax.draw_artist(artist)
+            for lines in self.hands.values():
+                for line in lines:
+                    ax.draw_artist(line)
+            canvas.blit(ax.bbox)
+        else:
+            ax.carpet.draw()
             
     def redraw(self):
         t = time.time()
@@ -149,10 +182,25 @@ class GuidoClock(Ball):
         hh, mm, ss = time.localtime(t)[3:6]
         self.draw(hh, mm, ss)
 
+    def setup(self):
+        """ Clear the axes and add the artists that draw updates """
+        ax = self.ax
+        ax.cla()
+
+        self.set_radius()
+        radius = self.radius
+        ax.set(frame_on=False, xticks=[], yticks=[],
+               xlim=(-radius, radius), ylim=(-radius, radius))
+        ax.set_aspect('equal')
+
+        self.wedges = []
+        self.hands = {}
 
     def draw(self, hh, mm, ss, colors=(0, 1, 2)):
 
-        self.ax.cla()
+        if self.wedges is None:
+            self.setup()
+            
         self.set_radius()
         radius = self.radius
         bigsize = self.bigsize
@@ -194,16 +242,21 @@ class GuidoClock(Ball):
     def draw_hand(self, angler, length, width, color):
         
         xx = yy = 0.0
-        
-        self.ax.plot(
-            [xx, xx + length*math.cos(angler)],
-            [yy, yy + length*math.sin(angler)],
-            linewidth=width * 1.2, color='black')
 
-        self.ax.plot(
-            [xx, xx + length*math.cos(angler)],
-            [yy, yy + length*math.sin(angler)],
-            linewidth=width, color=color)
+        xdata = [xx, xx + length*math.cos(angler)]
+        ydata = [yy, yy + length*math.sin(angler)]
+
+        # hands are keyed by colour, a black outline under each
+        if color not in self.hands:
+            outline, = self.ax.plot(xdata, ydata, color='black')
+            hand, = self.ax.plot(xdata, ydata, color=color)
+            self.hands[color] = outline, hand
+
+        outline, hand = self.hands[color]
+        outline.set_data(xdata, ydata)
+        outline.set_linewidth(width * 1.2)
+        hand.set_data(xdata, ydata)
+        hand.set_linewidth(width)
 
 
     def drawbg(self, bigd, litd, secd, colors=(0, 1, 2)):
@@ -250,6 +303,19 @@ class GuidoClock(Ball):
                 colors.append("#%02x%02x%02x" % tuple(fill))
                 wedges.append(extent)
 
-        self.ax.pie(wedges, colors=colors, radius=self.radius,
-                startangle=0, counterclock=False)
-        
+        # the number of wedges varies, keep enough and hide the spares
+        while len(self.wedges) < len(wedges):
+            wedge = patches.Wedge((0, 0), radius, 0, 0, clip_on=False)
+            self.ax.add_patch(wedge)
+            self.wedges.append(wedge)
+
+        # clockwise from zero degrees, as pie(counterclock=False) does
+        start = 0
+        for wedge, extent, colour in zip(self.wedges, wedges, colors):
+            wedge.set(radius=radius,
+                      theta1=-(start + extent), theta2=-start,
+                      facecolor=colour, visible=True)
+            start += extent
+
+        for wedge in self.wedges[len(wedges):]:
+            wedge.set_visible(False)
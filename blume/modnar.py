@@ -6,7 +6,10 @@ Use if you don't know what to use?
 
 import random
 import asyncio
-from matplotlib import pyplot as plt
+
+from .lazy import Lazy
+
+plt = Lazy('matplotlib.pyplot')
 
 def random_colour():
     """ Pick a random matplotlib colormap """
@@ -7,11 +7,12 @@
 
 """
 
-from matplotlib import rcParams, rc
-
 from collections import defaultdict, deque
 
 from .magic import Ball
+from .lazy import Lazy
+
+matplotlib = Lazy('matplotlib')
 
 
 class Params(Ball):
@@ -19,7 +20,7 @@ class Params(Ball):
     def __init__(self):
 
         super().__init__()
-        self.params = rcParams
+        self.params = matplotlib.rcParams
 
         self.groups = {}
         self.group_names = deque()
@@ -0,0 +1,668 @@
+"""Balls in other processes.
+
+Everything in a Farm shares one event loop in one process.  One Ball
+doing heavy sums and the whole farm gets one core.
+
+A Remote is a stand-in for a Ball that runs in a worker process.  The
+Remote sits in the farm like any other Ball: the shepherd runs it,
+pauses it and sends it keys, and the Remote passes all that on to the
+worker.
+
+RoundAbout channels are bridged over a pipe.  Messages are pickled,
+so whatever goes through needs to pickle.  Each bridged channel has a
+window: the sender waits once that many messages are in flight and
+not yet picked up at the other end.  So a slow consumer slows the
+producer down, just as a full queue does in one process.
+
+Axes cannot cross processes.  In the worker, getting from the default
+channel gives a Recorder, which just remembers what is done to it.
+When the Recorder is shown the calls are sent back to the main
+process, where they are replayed on a real Axe from the carpet.
+Plots get a window too: a run in the worker is not done until its
+plots have been sent.
+
+Return values in the worker are Recorders too, so things like::
+
+    img = ax.imshow(data)
+    await ax.show_colorbar(img)
+
+work, but code in the worker cannot look at the values.
+
+Usage::
+
+    farm = Farm()
+    farm.add(Mandy(), process=True)
+
+With the spawn start method (the default on macs and windows) the
+Ball itself is pickled to get it to the worker.
+
+Big arrays
+==========
+
+Pickling a big numpy array copies it, twice: once into the pipe and
+once out.  So arrays of `share` bytes or more go another way.  The
+sender copies the array into a shared memory segment and only a
+small descriptor goes through the pipe.  The receiver gets an array
+that is a view straight onto the segment, no copy.
+
+Segments come from a pool and are recycled.  When the last array (or
+view of an array) using a segment is garbage collected at the
+receiving end, a free message goes back and the sender returns the
+segment to its pool.
+"""
+import asyncio
+import inspect
+import weakref
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from collections import defaultdict, Counter
+from traceback import print_exc
+
+import numpy as np
+
+from . import magic
+
+# channel for plot payloads from the worker
+PLOT = '__plot__'
+
+
+class Recorder:
+    """ Stand in for an Axe in a worker process
+
+    Attribute access and calls are recorded, to be replayed on a real
+    Axe in the main process when show is called.
+    """
+
+    def __init__(self, bridge, calls=None, path=()):
+
+        self._bridge = bridge
+        self._calls = calls if calls is not None else []
+        self._path = path
+
+    def __getattr__(self, attr):
+
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+
+        return Recorder(self._bridge, self._calls, self._path + (attr,))
+
+    def __call__(self, *args, **kwargs):
+
+        args = tuple(reference(x) for x in args)
+        kwargs = {key: reference(value) for key, value in kwargs.items()}
+        self._calls.append((self._path, args, kwargs))
+
+        if self._path == ('show',):
+            self._bridge.post(PLOT, self._calls)
+
+        # refer to the result by the number of the call
+        return Recorder(self._bridge, self._calls, (len(self._calls) - 1,))
+
+    def __await__(self):
+        """ Allow `await ax.coroutine()`, the work happens later """
+        return iter(())
+
+
+class Ref:
+    """ A reference to a recorded result, in a replayed call """
+
+    def __init__(self, path):
+
+        self.path = path
+
+
+def reference(value):
+    """ Recorders in arguments become Refs """
+    if isinstance(value, Recorder):
+        return Ref(value._path)
+
+    return value
+
+
+async def replay(ax, calls):
+    """ Replay calls recorded by a Recorder on ax """
+    results = []
+
+    def resolve(path):
+        if path and isinstance(path[0], int):
+            obj, path = results[path[0]], path[1:]
+        else:
+            obj = ax
+        for attr in path:
+            obj = getattr(obj, attr)
+        return obj
+
+    def value(x):
+        return resolve(x.path) if isinstance(x, Ref) else x
+
+    for path, args, kwargs in calls:
+        func = resolve(path)
+        result = func(*(value(x) for x in args),
+                      **{key: value(x) for key, x in kwargs.items()})
+        if inspect.iscoroutine(result):
+            result = await result
+        results.append(result)
+
+
+class Shared:
+    """ Descriptor for an array in a shared memory segment """
+
+    def __init__(self, name, shape, dtype):
+
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+
+class SharedArrays:
+    """ Shared memory segments for arrays, recycled
+
+    share: arrays smaller than this many bytes are just pickled.
+
+    keep: how many free segments to hang on to.
+
+    Segment sizes are rounded up to a power of two, so a stream of
+    similar arrays keeps reusing the same few segments.
+    """
+
+    def __init__(self, share=2**16, keep=16):
+
+        self.share = share
+        self.keep = keep
+
+        # segments we created: in use and free, by size
+        self.owned = {}
+        self.free = defaultdict(list)
+
+        # segments the other end created, that we have attached to
+        self.attached = {}
+
+    def wants(self, value):
+
+        return (type(value) is np.ndarray
+                and not value.dtype.hasobject
+                and value.nbytes >= self.share)
+
+    def take(self, nbytes):
+        """ A segment with room for nbytes """
+        size = self.share
+        while size < nbytes:
+            size *= 2
+
+        if self.free[size]:
+            return self.free[size].pop()
+
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        self.owned[segment.name] = segment
+        return segment
+
+    def give(self, name):
+        """ Segment name is free for reuse """
+        segment = self.owned.get(name)
+        if segment is None:
+            return
+
+        free = self.free[segment.size]
+        if len(free) < self.keep:
+            free.append(segment)
+        else:
+            del self.owned[name]
+            segment.close()
+            segment.unlink()
+
+    def pack(self, value):
+        """ Swap big arrays in value for Shared descriptors """
+        if self.wants(value):
+            segment = self.take(value.nbytes)
+            view = np.ndarray(value.shape, value.dtype, segment.buf)
+            view[...] = value
+            del view
+            # the dtype itself, a dtype.str loses the fields of records
+            return Shared(segment.name, value.shape, value.dtype)
+
+        if type(value) in (list, tuple):
+            return type(value)(self.pack(x) for x in value)
+
+        if type(value) is dict:
+            return {key: self.pack(x) for key, x in value.items()}
+
+        return value
+
+    def unpack(self, value, release):
+        """ Swap Shared descriptors for arrays
+
+        release(name) is called once an array is no longer used.
+        """
+        if isinstance(value, Shared):
+            segment = self.attach(value.name)
+            array = np.ndarray(value.shape, value.dtype, segment.buf)
+
+            # views of array keep it alive, so this is the last user
+            weakref.finalize(array, self.consumed, value.name, release)
+            return array
+
+        if type(value) in (list, tuple):
+            return type(value)(self.unpack(x, release) for x in value)
+
+        if type(value) is dict:
+            return {key: self.unpack(x, release)
+                    for key, x in value.items()}
+
+        return value
+
+    def attach(self, name):
+
+        segment = self.attached.get(name)
+        if segment is None:
+            segment = shared_memory.SharedMemory(name=name)
+
+            # the creator unlinks, do not let the tracker do it as well
+            resource_tracker.unregister(segment._name, 'shared_memory')
+            self.attached[name] = segment
+
+        return segment
+
+    def consumed(self, name, release):
+        """ The array in segment name has gone, let go of the segment
+
+        Called by the garbage collector, so maybe not from our loop.
+        """
+        segment = self.attached.pop(name, None)
+        if segment is not None:
+            try:
+                segment.close()
+            except BufferError:
+                # someone still has a view of its buffer
+                pass
+
+        release(name)
+
+    def close(self):
+
+        for segment in self.attached.values():
+            try:
+                segment.close()
+            except BufferError:
+                # arrays still looking at it
+                pass
+
+        for segment in self.owned.values():
+            try:
+                segment.close()
+            except BufferError:
+                pass
+            segment.unlink()
+
+        self.owned.clear()
+        self.free.clear()
+        self.attached.clear()
+
+
+class Bridge:
+    """ One end of a pipe between processes
+
+    Messages are (kind, channel, payload) tuples.
+
+    put: payload for a channel at the other end.
+    ack: the other end has picked up a message from channel.
+    free: the other end is done with a shared memory segment.
+    quit: the other end is going away.
+
+    Anything else is passed to the handler.
+
+    Big arrays in payloads travel in shared memory, see SharedArrays.
+    """
+
+    def __init__(self, conn, handler, window=8, share=2**16):
+
+        self.conn = conn
+        self.handler = handler
+        self.window = window
+        self.credits = defaultdict(
+            lambda: asyncio.Semaphore(self.window))
+        self.arrays = SharedArrays(share)
+        self.loop = None
+        self.closed = False
+
+        # puts from code that cannot wait, see post
+        self.pending = set()
+
+    def send(self, channel, payload, kind='put'):
+
+        if self.closed:
+            # nobody listening
+            return
+
+        try:
+            payload = self.arrays.pack(payload)
+            self.conn.send((kind, channel, payload))
+        except Exception:
+            print(f'bridge failed to send to {channel}')
+            print_exc()
+
+    def release(self, name):
+        """ Done with a segment, tell the other end
+
+        Called by the garbage collector, so maybe not from our loop.
+        """
+        if self.closed:
+            return
+
+        try:
+            self.loop.call_soon_threadsafe(
+                self.send, None, name, 'free')
+        except RuntimeError:
+            # loop is closed, nobody to tell
+            pass
+
+    def close(self):
+
+        self.closed = True
+        self.arrays.close()
+        self.conn.close()
+
+    async def put(self, channel, payload):
+        """ Send, waiting if the window for channel is full """
+        await self.credits[channel].acquire()
+        self.send(channel, payload)
+
+    def post(self, channel, payload):
+        """ Put, from code that cannot wait
+
+        The put runs in a task, flush waits for them all.
+        """
+        task = magic.spawn(self.put(channel, payload))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def flush(self):
+        """ Wait until everything posted has been sent """
+        if self.pending:
+            await asyncio.gather(*self.pending)
+
+    def ack(self, channel):
+
+        self.send(channel, None, kind='ack')
+
+    async def listen(self):
+        """ Read messages until the other end goes away """
+        loop = self.loop = asyncio.get_running_loop()
+        while True:
+            try:
+                kind, channel, payload = await loop.run_in_executor(
+                    None, self.conn.recv)
+            except (EOFError, OSError):
+                print('bridge closed')
+                kind = 'quit'
+
+            if kind == 'quit':
+                self.close()
+                return
+
+            if kind == 'ack':
+                self.credits[channel].release()
+            elif kind == 'free':
+                self.arrays.give(payload)
+            else:
+                payload = self.arrays.unpack(payload, self.release)
+                result = self.handler(kind, channel, payload)
+                if inspect.iscoroutine(result):
+                    await result
+
+
+class BridgedRoundAbout(magic.RoundAbout):
+    """ The worker's roundabout
+
+    The default channel hands out Recorders, outputs go to the main
+    process and inputs send acks as they are picked up.
+    """
+
+    def __init__(self, bridge, inputs=(), outputs=()):
+
+        self.bridge = bridge
+        self.inputs = set(inputs)
+        self.outputs = set(outputs)
+
+        # fresh queues, any inherited from a fork belong to another loop
+        self.queues = defaultdict(magic.random_queue)
+        self.counts = Counter()
+        self.tracer = magic.Tracer()
+
+    async def put(self, item, name=None):
+
+        if name in self.outputs:
+            self.counts.update([f'bridge put {name}'])
+            await self.bridge.put(name, item)
+        else:
+            await super().put(item, name)
+
+    async def get(self, name=None):
+
+        if name is None:
+            return Recorder(self.bridge)
+
+        result = await super().get(name)
+        if name in self.inputs:
+            self.bridge.ack(name)
+
+        return result
+
+    def get_nowait(self, name=None):
+
+        if name is None:
+            return Recorder(self.bridge)
+
+        result = super().get_nowait(name)
+        if name in self.inputs:
+            self.bridge.ack(name)
+
+        return result
+
+
+class Worker:
+    """ Runs a Ball in a worker process, as told by its Remote """
+
+    def __init__(self, ball, conn, inputs=(), outputs=(), window=8,
+                 share=2**16):
+
+        self.ball = ball
+        self.bridge = Bridge(conn, self.handle, window, share)
+        self.inputs = inputs
+        self.outputs = outputs
+
+    async def main(self):
+
+        # everything in this process now goes through the bridge
+        magic.TheMagicRoundAbout = BridgedRoundAbout(
+            self.bridge, self.inputs, self.outputs)
+
+        result = self.ball.start()
+        if inspect.iscoroutine(result):
+            await result
+
+        await self.bridge.listen()
+
+    async def handle(self, kind, channel, payload):
+
+        if kind == 'put':
+            await magic.TheMagicRoundAbout.put(payload, channel)
+
+        elif kind == 'run':
+            # run in a task, so we keep listening while it runs
+            magic.spawn(self.run())
+
+        elif kind == 'key':
+            callback = self.ball.filters['keys'].get(payload)
+            if callback:
+                magic.spawn(self.call(callback))
+
+    async def run(self):
+
+        try:
+            result = self.ball.run()
+            if inspect.iscoroutine(result):
+                await result
+        except Exception:
+            print_exc()
+
+        # not done until the plots are on their way
+        await self.bridge.flush()
+        self.bridge.send(None, getattr(self.ball, 'sleep', 0), kind='ran')
+
+    async def call(self, callback):
+
+        try:
+            result = callback()
+            if inspect.iscoroutine(result):
+                await result
+        except Exception:
+            print_exc()
+
+
+def work(ball, conn, inputs=(), outputs=(), window=8, share=2**16):
+    """ Worker process entry point """
+    worker = Worker(ball, conn, inputs, outputs, window, share)
+    asyncio.run(worker.main())
+
+
+class Remote(magic.Ball):
+    """ Stand in for a Ball running in a worker process
+
+    ball: the Ball to run.
+
+    inputs: channels to pass from this process to the worker.
+
+    outputs: channels the worker puts to, passed back to this process.
+
+    window: messages in flight allowed per channel.
+
+    share: arrays this many bytes or bigger go via shared memory.
+    """
+
+    def __init__(self, ball, inputs=(), outputs=(), window=8, share=2**16):
+
+        super().__init__()
+
+        self.ball = ball
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.window = window
+        self.share = share
+        self.sleep = getattr(ball, 'sleep', self.sleep)
+        self.process = None
+        self.ran = None
+
+        # keys for the ball get sent to the worker
+        for key, callback in ball.filters['keys'].items():
+            self.add_filter(key, self.forward(key, callback))
+
+        # outputs arriving from the worker, in order, by channel
+        self.arrivals = defaultdict(asyncio.Queue)
+        self.tasks = []
+
+    def forward(self, key, callback):
+        """ A key callback that sends key to the worker """
+        def send():
+            self.bridge.send(None, key, kind='key')
+
+        send.__name__ = getattr(callback, '__name__', key)
+        send.__doc__ = callback.__doc__
+
+        return send
+
+    def __str__(self):
+
+        return f'remote {self.ball}'
+
+    async def start(self):
+
+        context = multiprocessing.get_context()
+        conn, child = context.Pipe()
+
+        self.bridge = Bridge(conn, self.handle, self.window, self.share)
+        self.process = context.Process(
+            target=work,
+            args=(self.ball, child, self.inputs, self.outputs,
+                  self.window, self.share),
+            daemon=True)
+        self.process.start()
+        child.close()
+
+        self.tasks = [magic.spawn(self.listen())]
+        for name in self.inputs:
+            self.tasks.append(magic.spawn(self.feed(name)))
+
+    async def listen(self):
+        """ Listen to the worker until it goes away """
+        await self.bridge.listen()
+
+        # whoever is waiting for a run would wait forever
+        if self.ran and not self.ran.done():
+            self.ran.set_exception(self.gone())
+
+    def gone(self):
+
+        return RuntimeError(f'worker process for {self.ball} has gone')
+
+    async def feed(self, name):
+        """ Pass items on channel name to the worker """
+        while True:
+            item = await self.get(name)
+            await self.bridge.put(name, item)
+
+    def handle(self, kind, channel, payload):
+
+        if kind == 'ran':
+            self.sleep = payload
+            if self.ran and not self.ran.done():
+                self.ran.set_result(True)
+
+        elif kind == 'put':
+            if channel not in self.arrivals:
+                self.tasks.append(magic.spawn(self.deliver(channel)))
+            self.arrivals[channel].put_nowait(payload)
+
+    async def deliver(self, channel):
+        """ Deliver what arrives from the worker, a channel at a time """
+        queue = self.arrivals[channel]
+        while True:
+            payload = await queue.get()
+            try:
+                if channel == PLOT:
+                    ax = await self.get()
+                    await replay(ax, payload)
+                else:
+                    await self.put(payload, channel)
+            except Exception:
+                print(f'remote failed to deliver to {channel}')
+                print_exc()
+
+            # tell the worker there is room for more
+            self.bridge.ack(channel)
+
+    async def run(self):
+        """ Ask the worker to run the ball once and wait for it """
+        if self.bridge.closed:
+            raise self.gone()
+
+        self.ran = asyncio.get_running_loop().create_future()
+        self.bridge.send(None, None, kind='run')
+        await self.ran
+
+    async def quit(self):
+
+        if self.process is None:
+            # never started
+            return
+
+        for task in self.tasks:
+            task.cancel()
+
+        # let the worker tidy up its segments and exit
+        self.bridge.send(None, None, kind='quit')
+        if self.process:
+            self.process.join(timeout=1)
+            if self.process.is_alive():
+                self.process.terminate()
+
+        self.bridge.close()
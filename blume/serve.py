@@ -0,0 +1,386 @@
+"""Watch a farm from a browser.
+
+The carpet only shows up in a window on the machine it runs on.  A
+FrameServer is a Ball that serves the carpet over http, to any
+browser that can reach it, and passes keys pressed in the browser back
+into the magic roundabout, just like keys pressed on the carpet.
+
+It is all standard library: an asyncio server that speaks just enough
+http and websocket for the job.
+
+The page is a canvas and a websocket.  Frames are cut into tiles, and
+only tiles whose pixels changed since the last frame are encoded and
+sent, each as a small png.  A clock ticking in one corner of the carpet
+costs a tile or two a second, not a whole frame.
+
+Each browser gets its own queue of tiles.  If a browser falls behind,
+its queue is thrown away and it gets a whole frame next time, so a slow
+browser never holds up the farm or other browsers.
+
+Usage::
+
+    python -m blume.serve --port 8765
+
+and point a browser at http://localhost:8765.
+
+Or, in a farm of your own::
+
+    server = FrameServer(farm.carpet, port=8765)
+    farm.add_node(server, background=True)
+"""
+import io
+import json
+import base64
+import struct
+import asyncio
+import hashlib
+import argparse
+from collections import Counter
+
+from . import magic
+from .lazy import Lazy
+
+np = Lazy('numpy')
+Image = Lazy('PIL.Image')
+
+# magic string from the websocket spec, RFC 6455
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+# browser key names that matplotlib spells differently
+KEYS = dict(
+    ArrowLeft='left',
+    ArrowRight='right',
+    ArrowUp='up',
+    ArrowDown='down',
+    Backspace='backspace',
+    Enter='enter',
+    Escape='escape',
+    Tab='tab',
+    Delete='delete',
+    Home='home',
+    End='end',
+    PageUp='pageup',
+    PageDown='pagedown',
+)
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><title>blume</title></head>
+<body style="margin: 0; background: grey">
+<canvas id="carpet" tabindex="0"></canvas>
+<script>
+const canvas = document.getElementById('carpet');
+const context = canvas.getContext('2d');
+const socket = new WebSocket(`ws://${location.host}/ws`);
+socket.binaryType = 'arraybuffer';
+
+socket.onmessage = async (event) => {
+    if (typeof event.data === 'string') {
+        const size = JSON.parse(event.data);
+        canvas.width = size.width;
+        canvas.height = size.height;
+        return;
+    }
+    const header = new DataView(event.data, 0, 4);
+    const x = header.getUint16(0);
+    const y = header.getUint16(2);
+    const png = new Blob([event.data.slice(4)], {type: 'image/png'});
+    context.drawImage(await createImageBitmap(png), x, y);
+};
+
+document.addEventListener('keydown', (event) => {
+    if (['Shift', 'Control', 'Alt', 'Meta'].includes(event.key)) return;
+    socket.send(event.key);
+    event.preventDefault();
+});
+canvas.focus();
+</script>
+</body>
+</html>
+"""
+
+
+class Client:
+    """ A browser, with its own queue of messages
+
+    If the queue fills up the browser has fallen behind, the queue is
+    dropped and the browser marked stale, to get a whole frame next.
+    """
+
+    def __init__(self, writer, backlog=256):
+
+        self.writer = writer
+        self.queue = asyncio.Queue(backlog)
+        self.stale = True
+
+    def send(self, message):
+
+        if self.stale:
+            return
+
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.stale = True
+
+    async def pump(self):
+        """ Write queued messages to the browser """
+        while True:
+            message = await self.queue.get()
+            self.writer.write(message)
+            await self.writer.drain()
+
+
+def websocket_frame(payload, opcode=2):
+    """ Frame payload as an unmasked, unfragmented websocket message
+
+    opcode: 1 for text, 2 for binary.
+    """
+    size = len(payload)
+    if size < 126:
+        header = struct.pack('!BB', 0x80 | opcode, size)
+    elif size < 2**16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, size)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, size)
+
+    return header + payload
+
+
+async def websocket_read(reader):
+    """ Read one websocket message, return (opcode, payload) """
+    first, second = await reader.readexactly(2)
+    opcode = first & 0x0f
+    size = second & 0x7f
+
+    if size == 126:
+        size, = struct.unpack('!H', await reader.readexactly(2))
+    elif size == 127:
+        size, = struct.unpack('!Q', await reader.readexactly(8))
+
+    # browsers always mask what they send
+    mask = await reader.readexactly(4) if second & 0x80 else bytes(4)
+    payload = await reader.readexactly(size)
+    payload = bytes(x ^ mask[ix % 4] for ix, x in enumerate(payload))
+
+    return opcode, payload
+
+
+def dirty_tiles(frame, last, tile):
+    """ Which tiles of frame differ from last
+
+    Returns a boolean array, one entry per tile.
+    """
+    rows, cols = frame.shape[:2]
+    nrows = -(-rows // tile)
+    ncols = -(-cols // tile)
+
+    if last is None or last.shape != frame.shape:
+        return np.ones((nrows, ncols), dtype=bool)
+
+    changed = np.zeros((nrows * tile, ncols * tile), dtype=bool)
+    changed[:rows, :cols] = (frame != last).any(axis=2)
+
+    return changed.reshape(nrows, tile, ncols, tile).any(axis=(1, 3))
+
+
+def encode_tile(frame, row, col, tile):
+    """ A websocket message with the png for one tile """
+    y, x = row * tile, col * tile
+    pixels = frame[y:y + tile, x:x + tile]
+
+    png = io.BytesIO()
+    Image.fromarray(pixels).save(png, 'png', compress_level=1)
+
+    return websocket_frame(struct.pack('!HH', x, y) + png.getvalue())
+
+
+class FrameServer(magic.Ball):
+    """ Serve the carpet to browsers
+
+    carpet: the Carpet to serve.
+
+    host, port: where to listen.  The default host keeps it to this
+    machine, use '0.0.0.0' for the LAN.
+
+    tile: tile size in pixels.
+    """
+
+    def __init__(self, carpet, host='localhost', port=8765, tile=64):
+
+        super().__init__()
+
+        self.carpet = carpet
+        self.host = host
+        self.port = port
+        self.tile = tile
+        self.sleep = 0.1
+
+        self.clients = set()
+        self.last = None
+        self.fresh = True
+        self.server = None
+
+        # tiles encoded and bytes sent, frames looked at
+        self.stats = Counter()
+
+        self.add_filter('O', self.show_stats)
+
+    async def start(self):
+
+        self.server = await asyncio.start_server(
+            self.connect, self.host, self.port)
+
+        # only look at frames when the carpet has drawn a new one
+        self.carpet.image.canvas.mpl_connect(
+            'draw_event', self.drawn)
+
+        print(f'serving carpet on http://{self.host}:{self.port}')
+
+    def drawn(self, event=None):
+
+        self.fresh = True
+
+    async def connect(self, reader, writer):
+        """ Handle a connection: the page or a websocket """
+        try:
+            request = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+
+        lines = request.decode('latin-1').split('\r\n')
+        method, path, *rest = lines[0].split()
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip().lower()] = value.strip()
+
+        if path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+            await self.websocket(reader, writer, headers)
+        elif path == '/':
+            self.respond(writer, '200 OK', 'text/html', PAGE.encode())
+        else:
+            self.respond(writer, '404 Not Found', 'text/plain', b'not found')
+
+        writer.close()
+
+    def respond(self, writer, status, kind, body):
+
+        writer.write(
+            f'HTTP/1.1 {status}\r\n'
+            f'Content-Type: {kind}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            'Connection: close\r\n\r\n'.encode() + body)
+
+    async def websocket(self, reader, writer, headers):
+
+        key = headers.get('sec-websocket-key', '') + WEBSOCKET_GUID
+        accept = base64.b64encode(hashlib.sha1(key.encode()).digest())
+
+        writer.write(
+            b'HTTP/1.1 101 Switching Protocols\r\n'
+            b'Upgrade: websocket\r\n'
+            b'Connection: Upgrade\r\n'
+            b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+
+        client = Client(writer)
+        pump = magic.spawn(client.pump())
+        self.clients.add(client)
+
+        # new browsers need a whole frame, send one soon
+        self.fresh = True
+
+        try:
+            await self.listen(reader, client)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients.discard(client)
+            pump.cancel()
+
+    async def listen(self, reader, client):
+        """ Keys from the browser go to the roundabout """
+        while True:
+            opcode, payload = await websocket_read(reader)
+
+            if opcode == 8:
+                # close
+                client.writer.write(websocket_frame(payload, opcode=8))
+                return
+
+            if opcode == 9:
+                # ping
+                client.writer.write(websocket_frame(payload, opcode=10))
+
+            elif opcode == 1:
+                key = payload.decode()
+                await self.put(magic.KeyPress(KEYS.get(key, key)), 'keys')
+
+    def grab(self):
+        """ The carpet's current pixels, as a (rows, cols, 4) array """
+        canvas = self.carpet.image.canvas
+        return np.array(canvas.buffer_rgba())
+
+    async def run(self):
+
+        if not self.clients or not self.fresh:
+            return
+
+        self.fresh = False
+        self.stats.update(['frames'])
+
+        frame = self.grab()
+        stale = [client for client in self.clients if client.stale]
+
+        if stale:
+            rows, cols = frame.shape[:2]
+            size = json.dumps(dict(width=cols, height=rows)).encode()
+            for client in stale:
+                client.stale = False
+                client.send(websocket_frame(size, opcode=1))
+
+        dirty = dirty_tiles(frame, self.last, self.tile)
+        everything = np.ones_like(dirty) if stale else dirty
+
+        for row, col in zip(*np.nonzero(everything)):
+            message = encode_tile(frame, row, col, self.tile)
+            self.stats.update(tiles=1, bytes=len(message))
+
+            for client in self.clients:
+                if dirty[row, col] or client in stale:
+                    client.send(message)
+
+        self.last = frame
+
+    async def show_stats(self):
+        """ Show frame server statistics """
+        stats = [[key, value] for key, value in self.stats.items()]
+        stats.append(['browsers', len(self.clients)])
+        await self.put(stats, 'help')
+
+
+def main(args=None):
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--tile', type=int, default=64)
+
+    args = parser.parse_args(args)
+
+    from . import farm as fm
+
+    farm = fm.Farm()
+    server = FrameServer(farm.carpet, args.host, args.port, args.tile)
+    farm.add_node(server, background=True)
+
+    fm.run(farm)
+
+
+if __name__ == '__main__':
+
+    main()
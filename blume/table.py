@@ -20,6 +20,12 @@ Thanks to John Gill for providing the class and table.
 
 """
 
+import numpy as np
+
+# matplotlib looks up its docstrings by class name: import its Table
+# before defining another one
+import matplotlib.table
+
 from matplotlib import artist, cbook
 from matplotlib.artist import Artist, allow_rasterization
 from matplotlib.patches import Rectangle
@@ -407,6 +413,7 @@ class Table(Artist):
 
         self._autoColumns = []
         self._autoFontsize = True
+        self._elide = False
         self._has_column_labels = False
         self.update(kwargs)
 
@@ -618,6 +625,41 @@ class Table(Artist):
         self._autoFontsize = value
         self.stale = True
 
+    def set_elide(self, value=True, ellipsis='...'):
+        """Elide text to fit the cells, rather than shrinking the font.
+
+        Text is measured with cached glyph widths, see
+        `blume.taybell.Metrics`, and the results are cached too, so
+        redrawing a big table is cheap.  Turns off automatic font size.
+        """
+        self._elide = value
+        self._ellipsis = ellipsis
+        if value:
+            self._autoFontsize = False
+        self.stale = True
+
+    def _elide_cells(self, renderer):
+        """Elide the text in each cell to fit its width."""
+        from .taybell import font_metrics
+
+        dpi = renderer.points_to_pixels(72)
+        for cell in self._cells.values():
+            text = cell._text
+            shown = text.get_text()
+
+            # the full text, unless someone has changed the text since
+            full = getattr(cell, '_full_text', None)
+            if full is None or shown != getattr(cell, '_shown_text', None):
+                full = cell._full_text = shown
+
+            pad = renderer.points_to_pixels(cell._get_horizontal_pad())
+            pixels = cell.get_window_extent(renderer).width - 2 * pad
+
+            shown = font_metrics(text.get_fontproperties(), dpi).elide(
+                full, pixels, self._ellipsis)
+            text.set_text(shown)
+            cell._shown_text = shown
+
     def _auto_set_font_size(self, renderer):
 
         if len(self._cells) == 0:
@@ -743,6 +785,9 @@ class Table(Artist):
 
         self._offset(ox, oy)
 
+        if self._elide:
+            self._elide_cells(renderer)
+
     def get_celld(self):
         r"""
         Return a dict of cells in the table mapping *(row, column)* to
@@ -765,6 +810,222 @@ class Table(Artist):
             cell.set_alpha(value)
         
 
+class RowColumn:
+    """A column of a list of rows, sliced without copying the rest."""
+
+    def __init__(self, rows, col):
+        self.rows = rows
+        self.col = col
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return [row[self.col] for row in self.rows[index]]
+
+
+def source_columns(source):
+    """
+    Column names and columns for a source of rows.
+
+    *source* can be an astropy Table, a numpy structured or 2D array, a
+    dict of columns or a list of rows.  Each column only has to support
+    `len` and slicing, so nothing is copied.
+    """
+    names = getattr(source, 'colnames', None)
+    if names is None:
+        names = getattr(getattr(source, 'dtype', None), 'names', None)
+
+    if names is not None:
+        return list(names), [source[name] for name in names]
+
+    if hasattr(source, 'keys'):
+        return [str(name) for name in source.keys()], list(source.values())
+
+    ndim = getattr(source, 'ndim', None)
+    if ndim == 2:
+        return ([str(col) for col in range(source.shape[1])],
+                [source[:, col] for col in range(source.shape[1])])
+
+    if not len(source):
+        return [], []
+
+    if ndim == 1 or isinstance(source[0], str) or not hasattr(
+            source[0], '__len__'):
+        # just the one column
+        return ['0'], [source]
+
+    cols = len(source[0])
+    return ([str(col) for col in range(cols)],
+            [RowColumn(source, col) for col in range(cols)])
+
+
+def format_value(value, fmt=None):
+    """Format a value for a cell, with *fmt* a format spec or callable."""
+    if value is np.ma.masked:
+        return ''
+
+    if fmt is not None:
+        if callable(fmt):
+            return fmt(value)
+        return format(value, fmt)
+
+    if isinstance(value, bytes):
+        return value.decode(errors='replace')
+
+    if isinstance(value, (float, np.floating)):
+        return f'{value:.6g}'
+
+    return str(value)
+
+
+class VirtualTable(Table):
+    """
+    A table onto a source with any number of rows.
+
+    Only the rows in view have cells, a header row of column names and a
+    column of row numbers.  Scrolling recycles the cells, setting their
+    text from the new rows; values are only formatted when they come
+    into view.
+
+    Text is elided to fit the cells, rather than searching for a font
+    size, and the font size follows the row height.  So drawing costs
+    the same for a thousand rows or a hundred million.
+
+    The corner cell shows which rows are in view.
+    """
+
+    def __init__(self, ax, source, rows=25, formats=None,
+                 colWidths=None, cellLoc='right', edges='closed',
+                 loc='bottom', bbox=None, **kwargs):
+        """
+        Parameters
+        ----------
+        ax : `matplotlib.axes.Axes`
+            The `~.axes.Axes` to plot the table into.
+        source : astropy Table, numpy array, dict of columns or list of rows
+            The data, see `source_columns`.
+        rows : int
+            The number of rows in view.
+        formats : dict, optional
+            Format spec, or callable, for values of a column, by name.
+        colWidths : list of float, optional
+            The column widths in units of the axes.  If not given they
+            are guessed from the first rows.
+
+        Other parameters are as for `.Table`.
+        """
+        super().__init__(ax, loc, bbox, **kwargs)
+        self.edges = edges
+
+        self.source = source
+        self.names, self.columns = source_columns(source)
+        if not self.names:
+            # nothing at all, an empty column keeps the table in shape
+            self.names, self.columns = [''], [[]]
+        self.nrows = len(self.columns[0]) if self.columns else 0
+        self.rows = min(rows, self.nrows) or 1
+        self.formats = formats or {}
+        self.top = 0
+
+        ncols = len(self.names)
+        if colWidths is None:
+            colWidths = self._guess_widths()
+
+        if self._bbox is not None:
+            height = 1.0 / (self.rows + 1)
+        else:
+            height = self._approx_text_height()
+
+        # the cells, made once and recycled as we scroll
+        for row in range(-1, self.rows):
+            self.add_cell(row, -1, width=colWidths[0], height=height,
+                          loc='left')
+            for col in range(ncols):
+                self.add_cell(row, col, width=colWidths[col + 1],
+                              height=height,
+                              loc='center' if row < 0 else cellLoc)
+                if row < 0:
+                    self[row, col]._text.set_text(self.names[col])
+        self._has_column_labels = True
+
+        self.set_elide(True)
+        self._fill()
+
+    def _guess_widths(self):
+        """Column widths in proportion to the first page of text."""
+        widths = [len(str(self.nrows))]
+        for name, column in zip(self.names, self.columns):
+            texts = [format_value(value, self.formats.get(name))
+                     for value in column[:self.rows]]
+            widths.append(max(map(len, texts + [name])))
+
+        widths = [width + 3 for width in widths]
+        total = sum(widths)
+        return [width / total for width in widths]
+
+    def _fill(self):
+        """Set the cells' text from the rows in view."""
+        top, bottom = self.top, min(self.top + self.rows, self.nrows)
+
+        for col, (name, column) in enumerate(zip(self.names, self.columns)):
+            fmt = self.formats.get(name)
+            values = column[top:bottom]
+            for row in range(self.rows):
+                text = ''
+                if row < len(values):
+                    text = format_value(values[row], fmt)
+                self._set_cell_text(row, col, text)
+
+        for row in range(self.rows):
+            text = str(top + row) if top + row < bottom else ''
+            self._set_cell_text(row, -1, text)
+
+        self._set_cell_text(-1, -1, f'{top}-{bottom} of {self.nrows}')
+        self.stale = True
+
+    def _set_cell_text(self, row, col, text):
+        cell = self[row, col]
+        cell._text.set_text(text)
+        # forget the text that elision was working from
+        cell._full_text = None
+
+    def scroll(self, rows):
+        """Scroll down by *rows*, up if negative."""
+        top = max(0, min(self.top + rows, self.nrows - self.rows))
+        if top != self.top:
+            self.top = top
+            self._fill()
+
+    def page_down(self):
+        """Show the next page of rows."""
+        self.scroll(self.rows)
+
+    def page_up(self):
+        """Show the previous page of rows."""
+        self.scroll(-self.rows)
+
+    def home(self):
+        """Show the first rows."""
+        self.scroll(-self.top)
+
+    def end(self):
+        """Show the last rows."""
+        self.scroll(self.nrows)
+
+    def _update_positions(self, renderer):
+        # fit the font to the row height, no need to measure any text
+        if self._bbox is not None:
+            rl, rb, rw, rh = self._bbox
+            height = rh * self._axes.bbox.height / (self.rows + 1)
+            size = min(self.FONTSIZE,
+                       height / renderer.points_to_pixels(1) / 1.5)
+            if size != self[-1, -1].get_fontsize():
+                self.set_fontsize(size)
+
+        super()._update_positions(renderer)
+
+
 def table(ax,
           cellText=None, cellColours=None,
           cellLoc='right', colWidths=None,
@@ -983,3 +1244,13 @@ def table(ax,
     
     ax.add_artist(table)
     return table
+
+
+def virtual_table(ax, source, **kwargs):
+    """Add a `VirtualTable` of *source* to an `~.axes.Axes`.
+
+    Keyword arguments are as for `VirtualTable`.
+    """
+    table = VirtualTable(ax, source, **kwargs)
+    ax.add_artist(table)
+    return table
@@ -31,8 +31,11 @@ For example, as table.describe() does for `pandas` tables.
 
 """
 
+import functools
+
 import numpy as np
-from . import table as mpl_table
+from matplotlib import font_manager, ft2font
+from .table import table as mpl_table
 #from . import Cell as mpl_Cell
 
 class Cell:
@@ -85,6 +88,17 @@ def shortify(values, maxlen=None, ellipsis=None, squash=None):
     return result
 
 def shortify_line(value, maxlen=None, ellipsis=None, squash=None):
+    """ Shorten value to maxlen characters
+
+    Results are cached, the same labels tend to come round again.
+    """
+    if isinstance(squash, list):
+        squash = tuple(squash)
+
+    return _shortify_line(value, maxlen, ellipsis, squash)
+
+@functools.lru_cache(maxsize=2**16)
+def _shortify_line(value, maxlen=None, ellipsis=None, squash=None):
 
     ellipsis = ellipsis or '...'
     size = len(value)
@@ -120,6 +134,111 @@ def shortify_line(value, maxlen=None, ellipsis=None, squash=None):
     #print('slug/spare/elen/value', sluglen, spare, elen, maxlen, size, len(value))
     return value
 
+
+# LoadFlags arrived in matplotlib 3.10, the old constants are deprecated
+try:
+    NO_HINTING = ft2font.LoadFlags.NO_HINTING
+except AttributeError:
+    NO_HINTING = ft2font.LOAD_NO_HINTING
+
+
+class Metrics:
+    """ Text widths in pixels, for one font at one size
+
+    Widths of glyphs are looked up once and cached, the width of a
+    string is then just a sum.  Kerning is ignored, so widths are a
+    little generous, which is the safe side for fitting text in.
+
+    Use `metrics` to get one, so they are shared.
+    """
+
+    def __init__(self, path, size, dpi):
+
+        self.key = (path, size, dpi)
+        self.path = path
+        self.size = size
+        self.dpi = dpi
+        self.widths = {}
+
+    def char(self, char):
+        """ Width of char in pixels """
+        width = self.widths.get(char)
+        if width is None:
+            # fonts are shared, so set the size each time
+            font = font_manager.get_font(self.path)
+            font.set_size(self.size, self.dpi)
+            glyph = font.load_char(ord(char), flags=NO_HINTING)
+            width = self.widths[char] = glyph.linearHoriAdvance / 65536
+
+        return width
+
+    def width(self, text):
+        """ Width of text in pixels, the widest line if more than one """
+        return max(sum(self.char(x) for x in line)
+                   for line in text.split('\n'))
+
+    def elide(self, text, pixels, ellipsis='...'):
+        """ Elide text to fit in pixels, line by line """
+        return '\n'.join(
+            elide_line(line, int(pixels), ellipsis, self)
+            for line in text.split('\n'))
+
+    def __hash__(self):
+
+        return hash(self.key)
+
+    def __eq__(self, other):
+
+        return self.key == other.key
+
+
+@functools.lru_cache(maxsize=None)
+def metrics(path, size, dpi=72):
+    """ The Metrics for the font file at path, at size points and dpi """
+    return Metrics(path, size, dpi)
+
+
+def font_metrics(prop, dpi=72):
+    """ Metrics for matplotlib FontProperties prop """
+    return metrics(font_manager.findfont(prop), prop.get_size_in_points(), dpi)
+
+
+@functools.lru_cache(maxsize=2**16)
+def elide_line(line, pixels, ellipsis, metrics):
+    """ Elide line to fit pixels, keeping its beginning and end
+
+    Like shortify_line, but measuring glyphs rather than counting
+    characters: as much of each end as fits either side of the
+    ellipsis, any spare going to the beginning.
+    """
+    widths = [metrics.char(x) for x in line]
+    if sum(widths) <= pixels:
+        return line
+
+    # shorten the ellipsis if even that does not fit
+    while ellipsis and metrics.width(ellipsis) > pixels:
+        ellipsis = ellipsis[:-1]
+
+    room = pixels - (metrics.width(ellipsis) if ellipsis else 0)
+
+    front, back = 0, len(widths)
+    used = 0.
+    while front < back:
+        # alternate, beginning first
+        if front <= len(widths) - back:
+            if used + widths[front] > room:
+                break
+            used += widths[front]
+            front += 1
+        else:
+            if used + widths[back - 1] > room:
+                break
+            used += widths[back - 1]
+            back -= 1
+
+    return line[:front] + ellipsis + line[back:]
+
+
 def taybell(ax, cells):
     """ """
     pass
@@ -136,7 +255,18 @@ def table(ax,
           col_width=None,
           row_width=None,
           squash=None,
+          elide=False,
           **kwargs):
+    """ A table, with long text shortened
+
+    max_cell_width, cell_width, col_width, row_width: shorten text to
+    this many characters.
+
+    squash: characters to remove first, when text is too long.
+
+    elide: fit text to the cells by eliding it at draw time, measured
+    in pixels, rather than shrinking the font.
+    """
 
     if max_cell_width:
         cell_width = cell_width or max_cell_width
@@ -166,6 +296,7 @@ def table(ax,
         cellText=cellText,
         rowLabels = rowLabels,
         colLabels = colLabels,
+        elide=elide,
         **kwargs)
 
 def tokens(line, sep=','):
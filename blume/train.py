@@ -15,7 +15,15 @@ import traceback
 
 import numpy as np
 
-from collections import deque, defaultdict, Counter
+from collections import deque, defaultdict, Counter, OrderedDict
+from concurrent import futures
+import asyncio
+import threading
+import sqlite3
+import queue
+import os
+import hashlib
+import functools
 import time
 import argparse
 
@@ -36,6 +44,27 @@ class Train(magic.Ball):
 
         self.extent = None
 
+        # extents for images that have them, eg fits, by path
+        self.extents = {}
+
+        # downsampled copies of fits images, by path, least recently
+        # used first; each holds its fits file open
+        self.pyramids = OrderedDict()
+        self.max_pyramids = 8
+        self.pyramid_lock = threading.Lock()
+
+        # remembers what is in the directories we have looked at,
+        # opened on the first scan, see file_index
+        self.files = None
+        self.scanning = None
+
+        # float32 work space for image transforms
+        self.buffers = Buffers()
+
+        # decodes the next few images in the background
+        self.loader = Loader(
+            self.load, ahead=self.prefetch, budget=self.cache_mb * 2**20)
+
         def reverse():
             """ U turn if U want 2 """
             self.rotation *= -1
@@ -60,6 +89,12 @@ class Train(magic.Ball):
         parser.add_argument('--min_entropy', type=float, default=.0)
         parser.add_argument('--boost', type=float, default=0)
         parser.add_argument('--rgb', action='store_true', default=False)
+        parser.add_argument('--prefetch', type=int, default=4,
+                            help='number of images to decode ahead')
+        parser.add_argument('--cache_mb', type=int, default=512,
+                            help='memory for decoded images, in MB')
+        parser.add_argument('--index',
+                            help='file index database, default in ~/.cache/blume')
         
         return parser
         
@@ -89,14 +124,19 @@ class Train(magic.Ball):
 
         # turn path into a Path
         self.path = Path(self.path)
+
+        if self.scanning:
+            self.scanning.stop()
+            self.scanning = None
         
         if not self.paths:
             if self.path.is_file():
                 self.paths = [self.path]
             else:
-                path = Path(self.path)
-                self.paths = list(path.glob('**/*.jpg'))
-                self.paths += list(path.glob('**/*.png'))
+                # paths arrive as the index scan finds them
+                self.paths = []
+                self.scanning = Scan(self.file_index(), self.path)
+                self.scanning.start()
         else:
             self.paths = [Path(path) for path in self.paths]
         self.paths = deque(sorted(self.paths))
@@ -108,6 +148,13 @@ class Train(magic.Ball):
         # not sure this works -- stop others stealing the show
         self.bads = set()
 
+    def file_index(self):
+        """ The Index, opened the first time it is needed """
+        if self.files is None:
+            self.files = Index(self.index)
+
+        return self.files
+
     def scan(self):
         """ Scan current position
 
@@ -182,7 +229,16 @@ class Train(magic.Ball):
                 scale = min(self.size/w, self.size/h)
 
             if scale:
-                image = image.resize((int(w * scale), int(h * scale)))
+                size = (int(w * scale), int(h * scale))
+
+                # let the decoder do most of the shrinking, jpeg only
+                image.draft(image.mode, size)
+
+                factor = min(image.width // size[0], image.height // size[1])
+                if factor > 1:
+                    image = image.reduce(factor)
+
+                image = image.resize(size)
 
         except:
             # maybe its fits
@@ -198,28 +254,44 @@ class Train(magic.Ball):
 
         return image
 
-    def get_rgb(self):
+    def load(self, path):
+        """ Return image and extent for path
+
+        This is what the loader runs in its threads.
+        """
+        image = self.get_image(path)
+
+        return image, self.extents.get(path)
+
+    def upcoming(self, count=None):
+        """ The next count paths to be shown, default loader.ahead """
+        paths = self.paths
+        count = min(count or self.loader.ahead, len(paths))
+        
+        return [paths[(-ix * self.rotation) % len(paths)]
+                for ix in range(count)]
+
+    async def get_rgb(self):
         """ Turn next three paths into an rgb """
         layers = []
-        for ix, c in enumerate('rgb'): 
-            path = self.paths[ix]
-            print("PATH", path)
-            image = self.get_image(path)
-            print("RGB", image.shape, path)
-            clip = getattr(self, 'clip' + c) or self.clip
-            if self.clip:
-                image.clip(clip)
-                image /= clip
-            else:
-                image /= image.max()
+        tops = []
+        try:
+            for c in 'rgb':
+                path = self.paths[0]
+                print("PATH", path)
+                image, extent = await self.loader.get(path)
+                layers.append(image)
+                tops.append(getattr(self, 'clip' + c) or self.clip)
 
-            layers.append(image[::-1].T)
-            #layers.append(image.T)
-            self.paths.rotate(self.rotation)
+                self.paths.rotate(self.rotation)
+        finally:
+            # three images a frame, so read three times as far ahead
+            ahead = 3 * self.loader.ahead
+            self.loader.prefetch(self.upcoming(ahead), ahead)
 
-        rgb = np.array(layers).T
+        rgb = stack(layers, self.buffers)
+        rgb = Normalise(tops)(rgb, self.buffers)
         print('RRRRRRRRRRRRRRR', rgb.shape)
-        (c,w,h) = rgb.shape
         self.rgbi = rgb
         
         return rgb
@@ -229,20 +301,30 @@ class Train(magic.Ball):
         #if len(self.paths) > 1:
         #    idx = random.randint(0, len(self.paths)-1)
 
+        if self.scanning:
+            self.paths.extend(self.scanning.drain())
+            if self.scanning.done:
+                print('PATHS', len(self.paths))
+                self.scanning = None
+
+        if not self.paths:
+            return
 
         path = self.paths[0]
         self.paths.rotate(self.rotation)
 
         if self.rgb:
-            image = self.get_rgb()
+            image = await self.get_rgb()
             print('rgb image shape', image.shape)
         else:
             try:
-                image = self.get_image(path)
+                image, self.extent = await self.loader.get(path)
             except Exception as e:
                 traceback.print_exception(e)
                 self.paths.rotate(self.rotation)
                 return
+            finally:
+                self.loader.prefetch(self.upcoming())
 
         mininfo = self.min_entropy
         if mininfo:
@@ -263,74 +345,728 @@ class Train(magic.Ball):
             cmap = magic.random_colour()
 
         print('EEEEEEEEEEEEE', self.extent)
-        ax.imshow(image, cmap=cmap, extent=self.extent)
+        img = ax.imshow(image, cmap=cmap, extent=self.extent)
+
+        if path in self.pyramids and not self.rgb:
+            zoom = Zoom(self, img, path)
+            for event in ('xlim_changed', 'ylim_changed'):
+                ax.callbacks.connect(event, zoom)
         
         ax.show()
 
     def fits_open(self, path):
+        """ Open a fits image, return a preview at display size
 
-        from astropy.io import fits
-        
-        tab = fits.open(path)
-        #print(tab.info())
-        for item in tab:
-            print(item.size)
-        if isinstance(item.size, int):
-            print('Array size:', item.size)
-        elif item.size:
-            #await self.show_stats(item)
-            pass
-
-        keys = [
-            ['title',
-             #'origin',
-             'duration',
-             #'date', 'date-beg', 'date-end',
-             'filter',
-             'mu_dec', 'mu_ra'],
-            ['crpix1', 'crpix2', 'crval1', 'crval2',],
-            [ 'crdelt1', 'crdelt2'],
-        ]
-
-        # there are other tables with simpler headers
-        for ix in 0, 1:
-            hdr = tab[ix].header
-            for key in keys[ix]:
-                print(key, hdr[key.upper()])
-
-        # figure out extents of image
-        v1 = hdr['crval1']; v2 = hdr['crval2']
-        p1 = hdr['crpix1']; p2 = hdr['crpix2']
-        d1 = hdr['cdelt1']; d2 = hdr['cdelt2']
+        The data is memory mapped, so only the parts needed for the
+        preview are read, and previews are cached on disk.
+
+        Zooming in reads the full resolution data, see zoom.
+        """
+        pyramid = self.pyramid(path)
+        image, extent = pyramid.preview(self.size)
 
-        ww, hh = tab[1].shape
-        extent = [v1 - (p1 * d1), v1 + ((hh-p1) * d1),
-                  v2 - (p2 * d2), v2 + ((ww-p2) * d2)]
         print('extent', extent)
-        print(hh, p1, ww, p2)
         self.extent = extent
-        xx, yy = tab[1].shape
-        print(xx, yy)
-        self.tab = tab
-        return tab[1].data
+        self.extents[path] = extent
+        self.tab = pyramid.tab
+
+        return image
+
+    def pyramid(self, path):
+        """ The Pyramid for path, opening it if need be
 
+        Only the max_pyramids most recently used are kept open, older
+        ones are closed.  This runs in the loader threads too.
+        """
+        with self.pyramid_lock:
+            pyramid = self.pyramids.get(path)
+            if pyramid is not None:
+                self.pyramids.move_to_end(path)
+                return pyramid
+
+            pyramid = Pyramid(path)
+            self.pyramids[path] = pyramid
+            while len(self.pyramids) > self.max_pyramids:
+                old, value = self.pyramids.popitem(last=False)
+                value.close()
+
+        return pyramid
 
     def booster(self, im):
         """ Scale pixel values in im by self. boost """
         if not self.boost: return im
 
         ent = im.entropy()
-        data = np.array(im.getdata())
-        
-        data *= int(self.boost)
-        data = np.clip(data, 0, 256)
-        data = [(int(x), int(y), int(z)) for x,y,z in data]
-        im.putdata(data)
+
+        boost = Pipeline(Gain(int(self.boost)), Clip(255),
+                         buffers=self.buffers)
+        im = Image.fromarray(boost(im).astype(np.uint8))
+
         newt = im.entropy()
         print('boost change in entropy:', newt - ent)
 
         return im
 
+
+class Zoom:
+    """ Show more detail for the current view of a fits image
+
+    Connected to both xlim_changed and ylim_changed.  A pan or zoom
+    changes both, so the read is put off to the next turn of the event
+    loop, done once, and skipped if the view has not changed.
+    """
+
+    def __init__(self, train, image, path):
+
+        self.train = train
+        self.image = image
+        self.path = path
+
+        self.pending = False
+        self.view = None
+
+    def __call__(self, ax):
+
+        if self.pending:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # no event loop, read straight away
+            self.read(ax)
+            return
+
+        self.pending = True
+        loop.call_soon(self.read, ax)
+
+    def read(self, ax):
+
+        self.pending = False
+        view = ax.get_xlim(), ax.get_ylim()
+        if view == self.view:
+            return
+        self.view = view
+
+        pyramid = self.train.pyramid(self.path)
+        data, extent = pyramid.region(*view, self.train.size)
+
+        self.image.set_data(data)
+        self.image.set_extent(extent)
+        ax.figure.canvas.draw_idle()
+
+
+class Buffers(threading.local):
+    """ float32 buffers to work in, reused frame after frame
+
+    Each thread gets its own set, so the loader threads and the event
+    loop do not tread on each other.
+    """
+
+    def get(self, key, shape):
+        """ Return the buffer for key, new if shape has changed """
+        buffer = self.__dict__.get(key)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.float32)
+            self.__dict__[key] = buffer
+
+        return buffer
+
+
+class Pipeline:
+    """ A chain of array transforms for images
+
+    Each step is called with the data and a Buffers and returns the
+    transformed data, in place where it can be.
+
+    The image is copied into a float32 buffer first, so steps never
+    touch the original.
+
+    What comes back is a buffer that will be reused, so copy it if it
+    needs to outlive the next call.  imshow makes its own copy.
+    """
+
+    def __init__(self, *steps, buffers=None):
+
+        self.steps = list(steps)
+        self.buffers = buffers or Buffers()
+
+    def __call__(self, image):
+
+        data = np.asarray(image)
+        buffer = self.buffers.get('pipeline', data.shape)
+        buffer[...] = data
+
+        for step in self.steps:
+            buffer = step(buffer, self.buffers)
+
+        return buffer
+
+
+class Clip:
+    """ Clip values to between bottom and top """
+
+    def __init__(self, top, bottom=0):
+
+        self.top = top
+        self.bottom = bottom
+
+    def __call__(self, data, buffers=None):
+
+        return np.clip(data, self.bottom, self.top, out=data)
+
+
+class Gain:
+    """ Multiply values by gain """
+
+    def __init__(self, gain):
+
+        self.gain = gain
+
+    def __call__(self, data, buffers=None):
+
+        return np.multiply(data, self.gain, out=data)
+
+
+class Normalise:
+    """ Scale each channel to between 0 and 1
+
+    tops: value to clip and divide by, per channel, if 0 or None use
+          the channel maximum.
+    """
+
+    def __init__(self, tops=None):
+
+        self.tops = tops
+
+    def __call__(self, data, buffers=None):
+
+        channels = [data]
+        if data.ndim == 3:
+            channels = [data[..., ix] for ix in range(data.shape[-1])]
+
+        tops = self.tops or [None] * len(channels)
+        for channel, top in zip(channels, tops):
+            if top:
+                np.clip(channel, 0, top, out=channel)
+            else:
+                top = channel.max() or 1
+
+            channel /= top
+
+        return data
+
+
+class Colormap:
+    """ Turn values between 0 and 1 into rgba with a colour map """
+
+    def __init__(self, cmap=None, size=256):
+
+        from matplotlib import colormaps
+        
+        cmap = colormaps[cmap or magic.random_colour()]
+        self.size = size
+        self.lut = cmap(np.linspace(0, 1, size)).astype(np.float32)
+
+    def __call__(self, data, buffers):
+
+        index = buffers.get('colormap_index', data.shape)
+        np.multiply(data, self.size - 1, out=index)
+        np.clip(index, 0, self.size - 1, out=index)
+
+        out = buffers.get('colormap', data.shape + (4,))
+
+        return np.take(self.lut, index.astype(np.intp), axis=0, out=out)
+
+
+def stack(layers, buffers):
+    """ Stack single channel layers into one image, a channel each
+
+    Layers are flipped top to bottom as they go in.
+    """
+    first = np.asarray(layers[0])
+    out = buffers.get('stack', first.shape + (len(layers),))
+
+    for ix, layer in enumerate(layers):
+        out[..., ix] = np.asarray(layer)[::-1]
+
+    return out
+
+
+class Pyramid:
+    """ Block averaged copies of a fits image, cached on disk
+
+    Level k is the image averaged over 2**k x 2**k blocks.
+
+    The fits data is memory mapped and levels are computed a band of
+    rows at a time, so the full image is never in memory.  Levels are
+    saved as .npy files, keyed on path, size and mtime of the fits
+    file, and memory mapped back in next time.
+
+    cache_bytes: the cache is pruned to this size, least recently
+    used files first, whenever a level is saved.
+    """
+
+    def __init__(self, path, hdu=1, cache=None, cache_bytes=2 * 2**30):
+
+        from astropy.io import fits
+
+        self.path = Path(path)
+        self.tab = fits.open(path, memmap=True)
+        self.hdr = self.tab[hdu].header
+        self.data = self.tab[hdu].data
+
+        if cache is None:
+            cache = Path.home() / '.cache' / 'blume' / 'pyramid'
+        self.cache = Path(cache)
+        self.cache.mkdir(parents=True, exist_ok=True)
+        self.cache_bytes = cache_bytes
+
+        stat = self.path.stat()
+        key = f'{self.path.absolute()} {stat.st_size} {stat.st_mtime} {hdu}'
+        self.key = hashlib.md5(key.encode()).hexdigest()
+        self.levels = {0: self.data}
+
+    def level(self, k):
+        """ Return level k """
+        if k in self.levels:
+            return self.levels[k]
+
+        filename = self.cache / f'{self.key}_{k}.npy'
+        if filename.exists():
+            # mark it as recently used, for prune
+            os.utime(filename)
+            data = np.load(filename, mmap_mode='r')
+        else:
+            # start from the finest level we already have
+            finer = max(x for x in self.levels if x < k)
+            data = block_mean(self.levels[finer], 2 ** (k - finer))
+            np.save(filename, data)
+            self.prune()
+
+        self.levels[k] = data
+
+        return data
+
+    def prune(self):
+        """ Delete the least recently used cache files, down to cache_bytes """
+        files = []
+        for filename in self.cache.glob('*.npy'):
+            try:
+                stat = filename.stat()
+            except OSError:
+                # another process got there first
+                continue
+            files.append((stat.st_mtime, stat.st_size, filename))
+
+        total = sum(size for mtime, size, filename in files)
+        for mtime, size, filename in sorted(files):
+            if total <= self.cache_bytes:
+                break
+            if filename.name.startswith(self.key):
+                # this image's levels may be in use
+                continue
+            filename.unlink(missing_ok=True)
+            total -= size
+
+    def close(self):
+        """ Close the fits file and forget the levels """
+        self.levels.clear()
+        self.data = None
+        self.tab.close()
+
+    def factor(self, rows, cols, size):
+        """ Level to use to show rows x cols pixels in about size """
+        k = 0
+        while max(rows, cols) / 2 ** k > size:
+            k += 1
+
+        return k
+
+    def extent(self, rows, cols):
+        """ Extent of full resolution pixels rows[0]:rows[1], cols[0]:cols[1]
+
+        Matches imshow's default origin, row 0 at the top.
+        """
+        hdr = self.hdr
+        v1 = hdr['crval1']; v2 = hdr['crval2']
+        p1 = hdr['crpix1']; p2 = hdr['crpix2']
+        d1 = hdr['cdelt1']; d2 = hdr['cdelt2']
+
+        nrows = self.data.shape[0]
+        return [v1 + ((cols[0] - p1) * d1), v1 + ((cols[1] - p1) * d1),
+                v2 + ((nrows - p2 - rows[1]) * d2),
+                v2 + ((nrows - p2 - rows[0]) * d2)]
+
+    def pixels(self, xlim, ylim):
+        """ Full resolution rows and columns for an x, y view """
+        hdr = self.hdr
+        v1 = hdr['crval1']; v2 = hdr['crval2']
+        p1 = hdr['crpix1']; p2 = hdr['crpix2']
+        d1 = hdr['cdelt1']; d2 = hdr['cdelt2']
+
+        nrows, ncols = self.data.shape
+        cols = sorted(p1 + ((x - v1) / d1) for x in xlim)
+        rows = sorted(nrows - p2 - ((y - v2) / d2) for y in ylim)
+
+        cols = [min(max(int(x), 0), ncols) for x in (cols[0], cols[1] + 1)]
+        rows = [min(max(int(x), 0), nrows) for x in (rows[0], rows[1] + 1)]
+
+        return rows, cols
+
+    def preview(self, size):
+        """ The whole image, in about size x size pixels, and its extent """
+        nrows, ncols = self.data.shape
+
+        return self.window((0, nrows), (0, ncols), size)
+
+    def region(self, xlim, ylim, size):
+        """ The part of the image in view, and its extent """
+        rows, cols = self.pixels(xlim, ylim)
+
+        return self.window(rows, cols, size)
+
+    def window(self, rows, cols, size):
+
+        k = self.factor(rows[1] - rows[0], cols[1] - cols[0], size)
+        scale = 2 ** k
+        data = self.level(k)
+
+        # level pixels covering the window, back in full resolution pixels
+        r0, c0 = rows[0] // scale, cols[0] // scale
+        r1 = max(r0 + 1, min(-(-rows[1] // scale), data.shape[0]))
+        c1 = max(c0 + 1, min(-(-cols[1] // scale), data.shape[1]))
+
+        extent = self.extent((r0 * scale, r1 * scale), (c0 * scale, c1 * scale))
+
+        # a copy, so nothing holds on to the memory maps
+        return np.array(data[r0:r1, c0:c1]), extent
+
+
+def block_mean(data, factor, rows=256):
+    """ Average factor x factor blocks of data
+
+    Works through data at most rows input rows at a time, so data can
+    be a memory mapped array bigger than memory.  When a block is
+    taller than rows, each block row is summed a slice at a time.
+
+    Rows and columns that do not make a full block are dropped.
+    """
+    nrows, ncols = data.shape[0] // factor, data.shape[1] // factor
+    width = ncols * factor
+    out = np.empty((nrows, ncols), dtype=np.float32)
+
+    if factor <= rows:
+        step = rows // factor
+        for row in range(0, nrows, step):
+            count = min(step, nrows - row)
+            band = np.asarray(
+                data[row * factor:(row + count) * factor, :width],
+                dtype=np.float32)
+            out[row:row + count] = band.reshape(
+                count, factor, ncols, factor).mean(axis=(1, 3))
+        return out
+
+    for row in range(nrows):
+        total = np.zeros(ncols, dtype=np.float64)
+        end = (row + 1) * factor
+        for start in range(row * factor, end, rows):
+            band = np.asarray(
+                data[start:min(start + rows, end), :width],
+                dtype=np.float32)
+            total += band.reshape(-1, ncols, factor).sum(axis=(0, 2))
+        out[row] = total / (factor * factor)
+
+    return out
+
+
+class Loader:
+    """ Load images in a pool of threads, ahead of when they are needed
+
+    load: function to turn a path into whatever is to be cached.
+
+    ahead: how many paths to load ahead.
+
+    budget: bytes of decoded images to keep.  Least recently used
+            images are dropped once over budget.
+
+    Decoding in threads keeps the event loop free for everyone else,
+    and the cache means going back over the same paths costs nothing.
+    """
+
+    def __init__(self, load, ahead=4, budget=512 * 2**20, workers=None):
+
+        self.load = load
+        self.ahead = ahead
+        self.budget = budget
+
+        self.pool = futures.ThreadPoolExecutor(max_workers=workers)
+        self.pending = {}
+        self.cache = OrderedDict()
+        self.nbytes = 0
+
+    def prefetch(self, paths, ahead=None):
+        """ Start loading paths not already loaded or on the way
+
+        ahead: how many of paths to load, default self.ahead.
+
+        Loads for paths that are no longer coming up are cancelled,
+        or dropped if already under way, so they do not hang on to
+        images outside the budget.
+        """
+        upcoming = paths[:ahead or self.ahead]
+        self.collect()
+
+        for path in list(self.pending):
+            if path not in upcoming:
+                self.pending.pop(path).cancel()
+
+        for path in upcoming:
+            if path in self.cache or path in self.pending:
+                continue
+            self.pending[path] = self.pool.submit(self.load, path)
+
+    def collect(self):
+        """ Move finished loads into the cache, so they count """
+        for path, future in list(self.pending.items()):
+            if not future.done():
+                continue
+
+            del self.pending[path]
+            if not future.cancelled() and future.exception() is None:
+                self.store(path, future.result())
+
+    async def get(self, path):
+        """ Return what load returns for path """
+        if path in self.cache:
+            self.cache.move_to_end(path)
+            return self.cache[path]
+
+        future = self.pending.pop(path, None)
+        if future is None:
+            future = self.pool.submit(self.load, path)
+
+        result = await asyncio.wrap_future(future)
+        self.store(path, result)
+
+        return result
+
+    def store(self, path, result):
+        """ Add result to the cache, then trim it to fit the budget """
+        self.cache[path] = result
+        self.nbytes += image_nbytes(result)
+
+        while self.nbytes > self.budget and len(self.cache) > 1:
+            old, value = self.cache.popitem(last=False)
+            self.nbytes -= image_nbytes(value)
+
+    def clear(self):
+
+        self.cache.clear()
+        self.nbytes = 0
+
+
+class Index:
+    """ A file index that persists between runs
+
+    Keeps path, size, mtime, dimensions and format for images in a
+    sqlite database, along with the mtime of each directory.
+
+    A directory whose mtime has not changed since last time is not
+    listed again, its files come straight from the database.  So the
+    second look at a big tree costs a stat per directory.
+    """
+
+    def __init__(self, dbpath=None, suffixes=('.jpg', '.png')):
+
+        if dbpath is None:
+            dbpath = Path.home() / '.cache' / 'blume' / 'train.db'
+            dbpath.parent.mkdir(parents=True, exist_ok=True)
+
+        self.dbpath = Path(dbpath)
+        self.suffixes = suffixes
+
+        db = self.connect()
+        try:
+            with db:
+                db.execute(
+                    'create table if not exists dirs '
+                    '(path text primary key, parent text, mtime real)')
+                db.execute(
+                    'create table if not exists files '
+                    '(path text primary key, dir text, size integer, mtime real, '
+                    'width integer, height integer, format text)')
+                db.execute('create index if not exists files_dir on files (dir)')
+                db.execute('create index if not exists dirs_parent on dirs (parent)')
+        finally:
+            db.close()
+
+    def connect(self):
+        """ A connection to the database, one per thread """
+        return sqlite3.connect(self.dbpath, timeout=60)
+
+    def scan(self, root):
+        """ Yield image paths under root, updating the index as we go
+
+        Directories are visited depth first, in sorted order, and
+        each directory's paths come out sorted.
+        """
+        db = self.connect()
+        try:
+            stack = [Path(root).absolute()]
+            while stack:
+                folder = stack.pop()
+                try:
+                    mtime = folder.stat().st_mtime
+                except OSError:
+                    continue
+
+                row = db.execute(
+                    'select mtime from dirs where path = ?',
+                    (str(folder),)).fetchone()
+
+                if row and row[0] == mtime:
+                    files = [Path(x[0]) for x in db.execute(
+                        'select path from files where dir = ? order by path',
+                        (str(folder),))]
+                    subdirs = [Path(x[0]) for x in db.execute(
+                        'select path from dirs where parent = ?',
+                        (str(folder),))]
+                else:
+                    files, subdirs = self.update(db, folder, mtime)
+
+                yield from sorted(files)
+
+                stack.extend(sorted(subdirs, reverse=True))
+        finally:
+            db.close()
+
+    def update(self, db, folder, mtime):
+        """ List folder, refreshing its entries in the index """
+        key = str(folder)
+        known = dict(
+            (x[0], x[1:]) for x in db.execute(
+                'select path, size, mtime from files where dir = ?', (key,)))
+
+        files = []
+        subdirs = []
+        try:
+            entries = sorted(os.scandir(folder), key=lambda x: x.name)
+        except OSError:
+            entries = []
+
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    subdirs.append(Path(entry.path))
+                    continue
+
+                if Path(entry.name).suffix not in self.suffixes:
+                    continue
+
+                stat = entry.stat()
+            except OSError:
+                continue
+
+            files.append(Path(entry.path))
+            if known.pop(entry.path, None) == (stat.st_size, stat.st_mtime):
+                continue
+
+            width = height = fmt = None
+            try:
+                with Image.open(entry.path) as image:
+                    width, height = image.size
+                    fmt = image.format
+            except Exception:
+                pass
+
+            db.execute(
+                'insert or replace into files values (?, ?, ?, ?, ?, ?, ?)',
+                (entry.path, key, stat.st_size, stat.st_mtime,
+                 width, height, fmt))
+
+        # forget what is no longer there
+        db.executemany('delete from files where path = ?',
+                       [(x,) for x in known])
+        gone = set(x[0] for x in db.execute(
+            'select path from dirs where parent = ?', (key,)))
+        gone.difference_update(str(x) for x in subdirs)
+        db.executemany('delete from dirs where path = ?',
+                       [(x,) for x in gone])
+        db.executemany('delete from files where dir = ?',
+                       [(x,) for x in gone])
+        db.executemany('insert or ignore into dirs values (?, ?, ?)',
+                       [(str(x), key, None) for x in subdirs])
+        db.execute('insert or replace into dirs values (?, ?, ?)',
+                   (key, str(folder.parent), mtime))
+        db.commit()
+
+        return files, subdirs
+
+    def info(self, path):
+        """ Return size, mtime, width, height and format for path """
+        with self.connect() as db:
+            return db.execute(
+                'select size, mtime, width, height, format '
+                'from files where path = ?',
+                (str(Path(path).absolute()),)).fetchone()
+
+
+class Scan(threading.Thread):
+    """ Run an Index scan in the background
+
+    Paths found are put on a queue, use drain to collect them.
+    """
+
+    def __init__(self, index, root):
+
+        super().__init__(daemon=True)
+        self.index = index
+        self.root = root
+        self.queue = queue.SimpleQueue()
+        self.stopped = threading.Event()
+        self.done = False
+
+    def run(self):
+
+        try:
+            for path in self.index.scan(self.root):
+                if self.stopped.is_set():
+                    break
+                self.queue.put(path)
+        finally:
+            self.done = True
+
+    def stop(self):
+
+        self.stopped.set()
+
+    def drain(self):
+        """ Return paths found since last time """
+        paths = []
+        while True:
+            try:
+                paths.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return paths
+
+
+def image_nbytes(image):
+    """ Rough number of bytes used by an image, or tuple of images """
+    if isinstance(image, tuple):
+        return sum(image_nbytes(item) for item in image)
+
+    if isinstance(image, np.ndarray):
+        return image.nbytes
+
+    if isinstance(image, Image.Image):
+        return image.width * image.height * len(image.getbands())
+
+    return 0
+
+
 async def run(args=None):
 
     fm = farm.Farm()
@@ -0,0 +1,108 @@
+import asyncio
+
+from matplotlib import pyplot as plt
+
+from blume import magic
+
+
+# the roundabout queues belong to a loop, so stick with one
+LOOP = asyncio.new_event_loop()
+
+
+def run_carpet(play, size=(1, 2)):
+    """ Run coroutine play(carpet) with a carpet being fed """
+    async def main():
+        carpet = magic.Carpet()
+        carpet.size = list(size)
+        feeder = magic.spawn(magic.canine(carpet))
+        try:
+            await play(carpet)
+        finally:
+            feeder.cancel()
+            plt.close(carpet.image)
+
+            # axes this carpet left in the roundabout
+            axes = carpet.select()
+            while not axes.empty():
+                axes.get_nowait()
+
+    LOOP.run_until_complete(main())
+
+
+def geometries(carpet):
+
+    return sorted(carpet.get_axe_geometry(axe)[:2]
+                  for axe in carpet.showing.values())
+
+
+def test_more_less_add_row():
+    # Check showing axes move to the new grid, and stay showing
+    async def play(carpet):
+        shown = []
+        for ix in range(2):
+            axe = await carpet.get()
+            axe.show()
+            shown.append(axe)
+
+        await carpet.more()
+        assert carpet.size == [2, 3]
+        assert geometries(carpet) == [(2, 3), (2, 3)]
+        assert all(axe.get_visible() for axe in shown)
+        assert len(carpet.image.axes) == 2 + 2 * 3
+
+        await carpet.less()
+        assert geometries(carpet) == [(1, 2), (1, 2)]
+        assert len(carpet.image.axes) == 2 + 1 * 2
+
+        await carpet.add_row()
+        assert carpet.size == [2, 2]
+        assert geometries(carpet) == [(2, 2), (2, 2)]
+
+        await carpet.less()
+        await carpet.less()
+        assert carpet.size == [1, 1]
+        assert sum(axe.get_visible() for axe in shown) == 1
+        assert len(carpet.showing) == 1
+
+    run_carpet(play)
+
+
+def test_rebuild_after_history_moves_on():
+    # Check an axe shown long ago, no longer in the history, still moves
+    async def play(carpet):
+        first = await carpet.get()
+        first.show()
+
+        second = await carpet.get()
+        spec = second.get_subplotspec()
+        second.show()
+
+        for ix in range(carpet.history.maxlen + 10):
+            axe = await carpet.get()
+            axe.set_subplotspec(spec)
+            axe.show()
+        assert first not in carpet.history
+
+        await carpet.more()
+        assert first.get_visible()
+        assert carpet.get_axe_geometry(first)[:2] == (2, 3)
+        assert first in carpet.showing.values()
+
+    run_carpet(play)
+
+
+def test_evictable_history_once():
+    # Check an axe in the history more than once is offered once
+    async def play(carpet):
+        first = await carpet.get()
+        second = await carpet.get()
+        for axe in (first, second, first, second):
+            axe.show()
+
+        assert list(carpet.history).count(first) == 2
+        history = [evict for kind, nbytes, evict in carpet.evictable()
+                   if kind == 'history']
+        assert len(history) == 1
+        assert history[0].args == (first,)
+
+    run_carpet(play, size=(1, 1))
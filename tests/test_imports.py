@@ -0,0 +1,64 @@
+import sys
+import subprocess
+
+HEAVY = ('numpy', 'matplotlib', 'PIL', 'dateutil')
+
+# seconds of import time allowed for import blume.farm, counting blume
+# and the heavy packages it might drag in
+IMPORT_BUDGET = 0.5
+COUNTED = ('blume', 'matplotlib', 'numpy', 'astropy')
+
+
+def run_python(code):
+
+    result = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True,
+        check=True)
+
+    return result.stdout.strip()
+
+
+def test_lazy_imports():
+    # Check the core does not import the heavy dependencies up front
+    loaded = run_python(
+        'import sys\n'
+        'import blume.magic, blume.farm\n'
+        f'print([x for x in {HEAVY!r} if x in sys.modules])')
+
+    assert loaded == '[]'
+
+
+def import_time(module):
+    """ Cumulative seconds, per -X importtime, of counted packages
+
+    Only the outermost imports are summed, they include the time of
+    everything they import in turn.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True)
+
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit() or name[1:2] == ' ':
+            # the header, or a nested import
+            continue
+        if name.strip().split('.')[0] in COUNTED:
+            total += int(cumulative)
+
+    return total / 1e6
+
+
+def test_import_budget():
+    # Check import blume.farm stays cheap, it is the console start up
+    elapsed = import_time('blume.farm')
+
+    assert 0 < elapsed < IMPORT_BUDGET
+
+
+def test_import_cpr():
+    # Check blume's Table does not upset matplotlib's docstrings
+    assert run_python('import blume.cpr; print("ok")') == 'ok'
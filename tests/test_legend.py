@@ -0,0 +1,65 @@
+from matplotlib import pyplot as plt
+
+from blume import legend
+
+
+def test_grid_layout():
+
+    data = [['a', 'bb', 'ccc'], ['dddd', 'e\nf']]
+
+    fig = plt.figure()
+    ax = fig.add_subplot()
+    grid = legend.Grid(data, mode='fixed', prop=dict(size=10))
+    ax.add_artist(grid)
+    fig.canvas.draw()
+    renderer = fig.canvas.get_renderer()
+
+    extent = grid.get_window_extent(renderer)
+    solution = grid.box.layout.solution
+
+    # scaling reuses the solution, and scales the extent
+    grid.scale(2)
+    fig.canvas.draw()
+    assert grid.box.layout.solution is solution
+
+    bigger = grid.get_window_extent(renderer)
+    assert abs(bigger.width - 2 * extent.width) < 1e-6
+    assert abs(bigger.height - 2 * extent.height) < 1e-6
+
+    # new text means a new solution
+    grid.set_text(0, 0, 'a much longer piece of text')
+    fig.canvas.draw()
+    assert grid.box.layout.solution is not solution
+    assert grid.get_window_extent(renderer).width > bigger.width
+
+    plt.close(fig)
+
+
+def test_grid_equal():
+
+    layout = legend.GridLayout([['a', 'bbbbbb'], ['c']], mode='equal')
+    path = legend.font_manager.findfont(legend.font_manager.FontProperties())
+    width, height, runs = layout.solve(path)
+
+    xs = sorted(set(x for line, x, y in runs))
+    ys = sorted(set(y for line, x, y in runs))
+    assert len(runs) == 3
+    assert abs((xs[1] - xs[0]) * 2 - width) < 1e-6
+    assert abs((ys[1] - ys[0]) * 2 - height) < 1e-6
+
+
+def test_grid_mathtext():
+
+    path = legend.font_manager.findfont(legend.font_manager.FontProperties())
+    raw = legend.GridLayout([[r'\alpha^{2}']], mode='fixed')
+    math = legend.GridLayout([[r'$\alpha^{2}$']], mode='fixed')
+
+    # mathtext is measured as drawn, not as its source
+    assert math.solve(path)[0] < raw.solve(path)[0]
+
+    fig = plt.figure()
+    ax = fig.add_subplot()
+    ax.add_artist(legend.Grid([[r'$\alpha^{2}$', 'x']], prop=dict(size=10)))
+    fig.canvas.draw()
+
+    plt.close(fig)
@@ -0,0 +1,179 @@
+import asyncio
+
+import pytest
+import numpy as np
+from matplotlib import pyplot as plt
+
+from blume import magic, remote
+
+
+def round_trip(value, share=1024):
+    """ Pack value at one end, unpack at the other """
+    sender = remote.SharedArrays(share)
+    receiver = remote.SharedArrays(share)
+    freed = []
+
+    packed = sender.pack(value)
+    result = receiver.unpack(packed, freed.append)
+
+    return sender, receiver, packed, result, freed
+
+
+def test_shared_round_trip():
+    # Check big arrays, records too, arrive intact, small ones pickled
+    records = np.zeros(1000, dtype=[('x', 'f8'), ('n', 'i4'), ('c', 'S4')])
+    records['x'] = np.arange(1000) / 7
+    records['n'] = np.arange(1000)
+    records['c'] = b'abcd'
+
+    value = dict(big=np.arange(10000.).reshape(100, 100),
+                 records=records,
+                 small=[np.arange(3)])
+
+    sender, receiver, packed, result, freed = round_trip(value)
+    try:
+        assert isinstance(packed['big'], remote.Shared)
+        assert isinstance(packed['records'], remote.Shared)
+        assert not isinstance(packed['small'][0], remote.Shared)
+
+        assert np.array_equal(result['big'], value['big'])
+        assert result['records'].dtype == records.dtype
+        assert np.array_equal(result['records'], records)
+        assert np.array_equal(result['small'][0], np.arange(3))
+    finally:
+        del result
+        receiver.close()
+        sender.close()
+
+
+def test_shared_reuse():
+    # Check segments come back when the receiver is done with them
+    sender, receiver, packed, result, freed = round_trip(np.ones(1000))
+    try:
+        view = result[10:20]
+        del result
+        assert freed == []
+        assert packed.name in receiver.attached
+
+        # the last view going frees the segment, and detaches it
+        del view
+        assert freed == [packed.name]
+        assert receiver.attached == {}
+
+        sender.give(packed.name)
+        again = sender.pack(np.zeros(1000))
+        assert again.name == packed.name
+
+        # bigger arrays need a bigger segment
+        assert sender.pack(np.zeros(10000)).name != packed.name
+    finally:
+        receiver.close()
+        sender.close()
+
+
+class Producer(magic.Ball):
+    """ Counts, plots and answers a key, in a worker process """
+
+    def __init__(self):
+
+        super().__init__()
+        self.count = 0
+        self.add_filter('u', self.up)
+
+    async def up(self):
+
+        await self.put('up', 'numbers')
+
+    async def run(self):
+
+        self.count += 1
+        await self.put(self.count, 'numbers')
+
+        ax = await self.get()
+        ax.plot([1, 2, 3], [3, 1, 2])
+        ax.show()
+
+
+class Plotter(magic.Ball):
+    """ Shows two plots a run, in a worker process """
+
+    async def run(self):
+
+        for ix in range(2):
+            ax = await self.get()
+            ax.plot([ix, ix + 1])
+            ax.show()
+
+
+def run_remote(play):
+    """ Run play(remote, carpet) with a Producer in a worker """
+    async def main():
+        carpet = magic.Carpet()
+        feeder = magic.spawn(magic.canine(carpet))
+        worker = remote.Remote(Producer(), outputs=['numbers'])
+        await worker.start()
+        try:
+            await play(worker, carpet)
+        finally:
+            await worker.quit()
+            feeder.cancel()
+            plt.close(carpet.image)
+
+    # queues belong to a loop, start afresh
+    magic.TheMagicRoundAbout.queues.clear()
+    asyncio.run(main())
+
+
+def test_remote_round_trip():
+    # Check outputs, keys and plots get back from the worker
+    async def play(worker, carpet):
+        await asyncio.wait_for(worker.run(), 10)
+        assert await asyncio.wait_for(worker.get('numbers'), 10) == 1
+
+        worker.filters['keys']['u']()
+        assert await asyncio.wait_for(worker.get('numbers'), 10) == 'up'
+
+        for ix in range(100):
+            shown = [axe for axe in carpet.showing.values()
+                     if axe.get_lines()]
+            if shown:
+                break
+            await asyncio.sleep(0.05)
+
+        assert len(shown) == 1
+        assert list(shown[0].get_lines()[0].get_ydata()) == [3, 1, 2]
+
+    run_remote(play)
+
+
+def test_remote_worker_dies():
+    # Check a run waiting on a dead worker fails, rather than hangs
+    async def play(worker, carpet):
+        worker.process.terminate()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(worker.run(), 10)
+
+    run_remote(play)
+
+
+def test_remote_plot_window():
+    # Check plots wait for the window, a run only ends once they are sent
+    async def main():
+        carpet = magic.Carpet()
+        worker = remote.Remote(Plotter(), window=1)
+        await worker.start()
+        try:
+            # nobody hands out axes, so the first plot is never acked
+            run = magic.spawn(worker.run())
+            done, waiting = await asyncio.wait([run], timeout=1)
+            assert not done
+
+            feeder = magic.spawn(magic.canine(carpet))
+            await asyncio.wait_for(run, 10)
+            feeder.cancel()
+        finally:
+            await worker.quit()
+            plt.close(carpet.image)
+
+    magic.TheMagicRoundAbout.queues.clear()
+    asyncio.run(main())
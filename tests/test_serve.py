@@ -0,0 +1,148 @@
+import os
+import struct
+import asyncio
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+from blume import magic, serve, table
+
+
+def test_dirty_tiles():
+    # Check only tiles with changed pixels are dirty
+    frame = np.zeros((100, 130, 4), dtype=np.uint8)
+    assert serve.dirty_tiles(frame, None, 64).shape == (2, 3)
+    assert serve.dirty_tiles(frame, None, 64).all()
+
+    changed = frame.copy()
+    changed[70, 129] = 255
+    dirty = serve.dirty_tiles(changed, frame, 64)
+    assert dirty.tolist() == [[False, False, False], [False, False, True]]
+
+    assert not serve.dirty_tiles(frame, frame.copy(), 64).any()
+    assert serve.dirty_tiles(frame, frame[:50], 64).all()
+
+
+def test_websocket_frame():
+    # Check payload lengths get the right size of header
+    assert serve.websocket_frame(b'hi', opcode=1) == b'\x81\x02hi'
+
+    message = serve.websocket_frame(bytes(200))
+    assert message[:4] == b'\x82\x7e\x00\xc8'
+    assert len(message) == 204
+
+    message = serve.websocket_frame(bytes(70000))
+    assert message[:2] == b'\x82\x7f'
+    assert struct.unpack('!Q', message[2:10]) == (70000,)
+
+
+def masked(payload, opcode=1):
+    """ A websocket message as a browser sends it, masked """
+    mask = os.urandom(4)
+    size = len(payload)
+    if size < 126:
+        header = struct.pack('!BB', 0x80 | opcode, 0x80 | size)
+    else:
+        header = struct.pack('!BBH', 0x80 | opcode, 0x80 | 126, size)
+
+    return header + mask + bytes(
+        x ^ mask[ix % 4] for ix, x in enumerate(payload))
+
+
+def test_websocket_read():
+    # Check masked and unmasked messages of any size read back
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(masked(b'PageDown'))
+        reader.feed_data(masked(bytes(range(256)) * 2, opcode=2))
+        reader.feed_data(serve.websocket_frame(b'plain'))
+
+        assert await serve.websocket_read(reader) == (1, b'PageDown')
+        assert await serve.websocket_read(reader) == (
+            2, bytes(range(256)) * 2)
+        assert await serve.websocket_read(reader) == (2, b'plain')
+
+    asyncio.run(read())
+
+
+def test_frame_server():
+    # Check a browser gets the frame size and tiles, and its keys arrive
+    async def browse():
+        carpet = magic.Carpet()
+        carpet.image.canvas.draw()
+
+        server = serve.FrameServer(carpet, port=0)
+        await server.start()
+        port = server.server.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection('localhost', port)
+        writer.write(
+            b'GET /ws HTTP/1.1\r\n'
+            b'Host: localhost\r\n'
+            b'Upgrade: websocket\r\n'
+            b'Connection: Upgrade\r\n'
+            b'Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n\r\n')
+        response = await reader.readuntil(b'\r\n\r\n')
+        assert response.startswith(b'HTTP/1.1 101')
+        # the example key from the websocket spec, RFC 6455
+        assert b's3pPLMBiTxaQ9kYGzzhZRbK+xOo=' in response
+
+        # wait for the server to notice the browser
+        while not server.clients:
+            await asyncio.sleep(0.01)
+        await server.run()
+
+        opcode, size = await serve.websocket_read(reader)
+        assert opcode == 1
+
+        width, height = carpet.image.canvas.get_width_height()
+        assert size == b'{"width": %d, "height": %d}' % (width, height)
+
+        tiles = -(-width // 64) * -(-height // 64)
+        for ix in range(tiles):
+            opcode, tile = await serve.websocket_read(reader)
+            assert opcode == 2
+            assert tile[4:8] == b'\x89PNG'
+
+        writer.write(masked(b'PageDown'))
+        key = await asyncio.wait_for(server.get('keys'), 5)
+        assert key.key == 'pagedown'
+
+        # hang up, and let the server see the browser go
+        writer.close()
+        await writer.wait_closed()
+        while server.clients:
+            await asyncio.sleep(0.01)
+
+        server.server.close()
+        await server.server.wait_closed()
+        plt.close(carpet.image)
+
+    # queues belong to a loop, start afresh
+    magic.TheMagicRoundAbout.queues.clear()
+    asyncio.run(browse())
+
+
+def test_show_stats():
+    # Check the stats make a help table, one row per stat
+    async def stats():
+        carpet = magic.Carpet()
+        server = serve.FrameServer(carpet)
+        server.stats.update(tiles=12, bytes=34567, frames=8)
+
+        await server.show_stats()
+        msg = await asyncio.wait_for(server.get('help'), 5)
+        assert not magic.is_big_table(msg)
+
+        widths = magic.get_widths(msg)
+        tab = table.table(
+            carpet.foreground, cellText=msg, bbox=(0, 0, 1, 1),
+            colWidths=widths)
+        carpet.image.canvas.draw()
+
+        assert len(widths) == 2
+        assert tab[3, 0].text == 'browsers'
+        plt.close(carpet.image)
+
+    magic.TheMagicRoundAbout.queues.clear()
+    asyncio.run(stats())
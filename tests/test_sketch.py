@@ -0,0 +1,51 @@
+import random
+
+from blume.sketch import Profiler, HyperLogLog, MisraGries, Quantiles
+
+
+def test_heavy_hitters_merge():
+    # Check merged sketches find the same heavy hitters as one sketch
+    values = [f'v{int(random.paretovariate(1.5))}' for x in range(20000)]
+
+    whole = MisraGries(k=16)
+    left, right = MisraGries(k=16), MisraGries(k=16)
+    for ix, value in enumerate(values):
+        whole.update(value)
+        (left if ix % 2 else right).update(value)
+
+    left.merge(right)
+    top = [value for value, count in whole.most_common(3)]
+    assert [value for value, count in left.most_common(3)] == top
+    assert left.n == len(values)
+
+
+def test_distinct_count():
+    hll = HyperLogLog()
+    for value in range(50000):
+        hll.update(value)
+
+    assert abs(hll.count() - 50000) < 50000 * 0.05
+
+
+def test_profiler_topn():
+    rows = [dict(a=str(x % 3), b=str(x)) for x in range(100)]
+    profiler = Profiler().update_rows(rows[:50])
+    profiler.merge(Profiler().update_rows(rows[50:]))
+
+    assert profiler.topn(1)['a'] == [('0', 34)]
+    assert profiler['b'].summary()['median'] in (49.0, 50.0)
+
+
+def test_quantiles_merge_many():
+    # Check merging many sketches keeps every level, and so memory, small
+    total = Quantiles(k=32)
+    for part in range(200):
+        sketch = Quantiles(k=32)
+        for value in range(part * 100, (part + 1) * 100):
+            sketch.update(value)
+        total.merge(sketch)
+
+        assert all(len(level) < total.k for level in total.levels)
+
+    assert total.n == 20000
+    assert abs(total.quantile(0.5) - 10000) < 20000 * 0.1
@@ -0,0 +1,44 @@
+import datetime
+
+from blume.magic import Spell
+
+
+def rows():
+
+    data = [dict(n=str(ix), x=str(ix), when=f'2021-01-{1 + ix:02d}')
+            for ix in range(10)]
+    data[6]['n'] = '6.5'
+    data[8]['x'] = 'eight'
+
+    return data
+
+
+def test_stream_upcasts_everything_buffered():
+    # Check upcasts later in the data recast the rows before them
+    spell = Spell()
+    result = list(spell.stream(iter(rows())))
+
+    assert all(isinstance(row['n'], float) for row in result)
+    assert all(isinstance(row['x'], str) for row in result)
+    assert isinstance(result[0]['when'], datetime.datetime)
+    assert spell.datekey == 'when'
+    assert not spell.late
+
+
+def test_stream_bounded_rewind():
+    # Check a small buffer only recasts rows still in the buffer
+    spell = Spell()
+    result = list(spell.stream(iter(rows()), cache=3))
+
+    assert [type(row['n']) for row in result] == [int] * 3 + [float] * 7
+    assert spell.late['n'] == 1
+
+
+def test_stream_late_upcast_skips_values():
+    # Check values that are not strings pass through a late upcast
+    data = [dict(n='1'), dict(n=2), dict(n='3.5')]
+    result = list(Spell().stream(iter(data)))
+
+    assert [row['n'] for row in result] == [1.0, 2, 3.5]
+    assert type(result[0]['n']) is float
+    assert type(result[1]['n']) is int
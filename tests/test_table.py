@@ -3,7 +3,7 @@ import numpy as np
 from matplotlib.testing.decorators import image_comparison
 from matplotlib.colors import Normalize
 
-from blume.table import Cell, Table, table
+from blume.table import Cell, Table, table, virtual_table
 from matplotlib.path import Path
 
 
@@ -270,3 +270,65 @@ def test_table_cells():
     # properties and setp
     table.properties()
     plt.setp(table)
+
+
+def test_elide():
+    # Check elided text fits its cell, at the original font size
+    fig, ax = plt.subplots()
+    cellText = [['a rather long piece of text', 'short']] * 3
+    the_table = table(ax, cellText=cellText, bbox=(0, 0, 0.5, 1),
+                      elide=True)
+    fontsize = the_table[0, 0].get_fontsize()
+
+    fig.canvas.draw()
+    renderer = fig.canvas.get_renderer()
+
+    cell = the_table[0, 0]
+    assert cell.get_fontsize() == fontsize
+    assert cell._text.get_text() != cellText[0][0]
+    assert '...' in cell._text.get_text()
+    assert (cell._text.get_window_extent(renderer).width <=
+            cell.get_window_extent(renderer).width)
+    assert the_table[0, 1]._text.get_text() == 'short'
+
+
+def test_virtual_table():
+    # Check only the rows in view get cells, recycled when paging
+    fig, ax = plt.subplots()
+    data = np.zeros(100000, dtype=[('n', 'i8'), ('x', 'f8')])
+    data['n'] = np.arange(len(data))
+    the_table = virtual_table(ax, data, rows=10, bbox=(0, 0, 1, 1),
+                              formats=dict(x='.2f'))
+    fig.canvas.draw()
+
+    cells = dict(the_table.get_celld())
+    assert len(cells) == 11 * 3
+    assert the_table[0, 0]._text.get_text() == '0'
+    assert the_table[0, 1]._text.get_text() == '0.00'
+
+    the_table.page_down()
+    fig.canvas.draw()
+    assert the_table.get_celld() == cells
+    assert the_table[0, 0]._text.get_text() == '10'
+
+    the_table.end()
+    assert the_table[9, 0]._text.get_text() == '99999'
+    the_table.page_down()
+    assert the_table[9, 0]._text.get_text() == '99999'
+
+    the_table.home()
+    the_table.page_up()
+    assert the_table[0, -1]._text.get_text() == '0'
+
+
+def test_virtual_table_sources():
+    # Check 1D arrays, lists of values and empty sources all draw
+    for source in (np.arange(100.), ['x', 'y'], {}, [], np.zeros((0, 3))):
+        fig, ax = plt.subplots()
+        the_table = virtual_table(ax, source, bbox=(0, 0, 1, 1))
+        fig.canvas.draw()
+        the_table.page_down()
+        fig.canvas.draw()
+        assert the_table[-1, -1]._text.get_text().endswith(
+            f'of {len(source)}')
+        plt.close(fig)